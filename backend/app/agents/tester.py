@@ -5,22 +5,157 @@ and provides feedback on test results.
 """
 
 import logging
+import hashlib
 import json
 import re
+import shutil
+import stat
 import subprocess
 import tempfile
+import time
 import os
 import sys
 import asyncio
+from functools import partial
 from typing import Dict, List, Any, Optional
 
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 from .base import Agent
+from ..core.config import settings
 from ..services.ai_service import AIService
 from ..utils import clean_language_name
 
 # Configure logging
 logger = logging.getLogger("agents.tester")
 
+# Compiled artifacts keyed by source hash, reused when the same code is run again.
+# Binaries from here are executed, so the directory must be private to this user.
+BUILD_CACHE_DIR = os.path.join(tempfile.gettempdir(), "coder-agent-build-cache")
+BUILD_CACHE_MAX_ENTRIES = 256
+BUILD_CACHE_MAX_AGE = 24 * 60 * 60  # seconds since an entry was last used
+
+# Scratch files for test runs go to tmpfs when available so they never touch disk.
+# Docker mounts /dev/shm noexec, which only matters for natively compiled binaries.
+SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+SCRATCH_NOEXEC = bool(SCRATCH_DIR and os.statvfs(SCRATCH_DIR).f_flag & getattr(os, "ST_NOEXEC", 0))
+
+# Limits for every compile and test process
+EXECUTION_TIMEOUT = 10  # seconds
+MAX_OUTPUT_SIZE = 1024 * 1024  # bytes kept per stream
+READ_CHUNK_SIZE = 64 * 1024
+
+# Short-lived JVMs start faster with the shared class archive, C1-only JIT and serial GC
+JVM_FAST_START_FLAGS = ["-Xshare:auto", "-XX:TieredStopAtLevel=1", "-XX:+UseSerialGC"]
+
+# Patterns used on every test run, compiled once
+JAVA_PUBLIC_CLASS_RE = re.compile(r"public\s+(?:final\s+|abstract\s+)*class\s+(\w+)")
+PYTHON_MISSING_MODULE_RE = re.compile(r"ModuleNotFoundError: No module named ['\"]([^'\"]+)['\"]")
+NODE_MISSING_MODULE_RE = re.compile(r"Cannot find module ['\"]([^'\"]+)['\"]")
+JAVA_MISSING_CLASS_RE = re.compile(r"(ClassNotFoundException|NoClassDefFoundError): ([A-Za-z0-9_.]+)")
+
+# Test case formats recognised in problem requirements
+# Cải thiện mẫu regex để chỉ lấy kết quả thực tế, không bao gồm phần giải thích
+EXAMPLE_RE = re.compile(
+    r"Example[s]?[\s\d]*:[\s\n]*(Input[\s\n]*:[\s\n]*(.+?)[\s\n]*Output[\s\n]*:[\s\n]*([^\n\r]+))",
+    re.DOTALL | re.IGNORECASE
+)
+# Test case pattern with "=>"
+TEST_CASE_RE = re.compile(r"Test Case[\s\d]*:[\s\n]*(.+?)[\s\n]*=>[\s\n]*([^\n\r]+)", re.DOTALL | re.IGNORECASE)
+
+
+def _default_max_runs() -> int:
+    """Size the run pool by CPU count and by memory at roughly 250 MB per compiler/JVM."""
+    cpus = os.cpu_count() or 1
+    try:
+        memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return cpus
+    return max(1, min(cpus, memory // (250 * 1024 * 1024)))
+
+
+# Admission control for test runs: at most MAX_CONCURRENT_RUNS compile/run jobs at once
+MAX_CONCURRENT_RUNS = _default_max_runs()
+_runs_in_flight = 0
+_runs_condition = asyncio.Condition()
+
+
+def _build_cache_root() -> Optional[str]:
+    """Create or validate the build cache directory.
+    
+    Returns:
+        BUILD_CACHE_DIR, or None if it is not a directory owned by and private to
+        this user (e.g. another local user created it first)
+    """
+    try:
+        os.makedirs(BUILD_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.lstat(BUILD_CACHE_DIR)
+    except OSError as e:
+        logger.warning(f"Build cache unavailable: {e}")
+        return None
+    if not stat.S_ISDIR(st.st_mode) or (hasattr(os, "getuid") and st.st_uid != os.getuid()):
+        logger.warning(f"Build cache disabled: {BUILD_CACHE_DIR} is not a directory owned by this user")
+        return None
+    if st.st_mode & 0o077:
+        # Left open by an earlier version (or umask); ours, so lock it down
+        try:
+            os.chmod(BUILD_CACHE_DIR, 0o700)
+        except OSError as e:
+            logger.warning(f"Build cache unavailable: {e}")
+            return None
+    return BUILD_CACHE_DIR
+
+
+def _prune_build_cache(root: str) -> None:
+    """Drop build cache entries unused for BUILD_CACHE_MAX_AGE, then the least
+    recently used ones beyond BUILD_CACHE_MAX_ENTRIES."""
+    cutoff = time.time() - BUILD_CACHE_MAX_AGE
+    entries = []
+    for language in os.listdir(root):
+        language_dir = os.path.join(root, language)
+        if not os.path.isdir(language_dir):
+            continue
+        for name in os.listdir(language_dir):
+            path = os.path.join(language_dir, name)
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                continue
+            if mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+            elif len(name) == 64:
+                # Finished entries only; younger staging directories are in flight
+                entries.append((mtime, path))
+    
+    # Most recently used first
+    entries.sort(reverse=True)
+    for _, path in entries[BUILD_CACHE_MAX_ENTRIES:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _apply_rlimits(pid: int, limit_memory: bool) -> None:
+    """Apply kernel resource limits to a freshly spawned child.
+    
+    Set from the parent with prlimit(2) rather than a preexec_fn, which is not
+    safe to run in a process that has other threads. Only Linux has prlimit;
+    elsewhere the wall-clock timeout in _run_process is the only bound.
+    """
+    if not hasattr(resource, "prlimit"):
+        return
+    try:
+        resource.prlimit(pid, resource.RLIMIT_CPU, (EXECUTION_TIMEOUT, EXECUTION_TIMEOUT))
+        memory_limit = settings.TEST_MEMORY_LIMIT_MB * 1024 * 1024
+        if limit_memory and memory_limit > 0:
+            resource.prlimit(pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except ProcessLookupError:
+        # Already exited
+        pass
+    except OSError as e:
+        logger.warning(f"Could not set resource limits on process {pid}: {e}")
+
 
 class TesterAgent(Agent):
     """Agent responsible for executing code against test cases and providing feedback."""
@@ -63,7 +198,7 @@ class TesterAgent(Agent):
         if "FAILED" in output or error:
             # Trường hợp ModuleNotFoundError, gợi ý cài đặt package
             if "ModuleNotFoundError" in error:
-                module_match = re.search(r"ModuleNotFoundError: No module named ['\"]([^'\"]+)['\"]", error)
+                module_match = PYTHON_MISSING_MODULE_RE.search(error)
                 if module_match:
                     missing_module = module_match.group(1)
                     summary = f"Thiếu thư viện: {missing_module}. Hãy cài đặt bằng lệnh 'pip install {missing_module}'."
@@ -87,26 +222,59 @@ class TesterAgent(Agent):
         }
     
     async def _run_code(self, code: str, language: str) -> tuple:
+        """Run code once a run slot is free.
+        
+        Args:
+            code: The source code to execute
+            language: Programming language
+            
+        Returns:
+            Tuple of (output, execution_time, error)
+        """
+        global _runs_in_flight
+        async with _runs_condition:
+            await _runs_condition.wait_for(lambda: _runs_in_flight < MAX_CONCURRENT_RUNS)
+            _runs_in_flight += 1
+        try:
+            return await self._execute_code(code, language)
+        finally:
+            async with _runs_condition:
+                _runs_in_flight -= 1
+                _runs_condition.notify(1)
+    
+    async def _execute_code(self, code: str, language: str) -> tuple:
         """Run code with the provided input.
         
         Args:
             code: The source code to execute
             language: Programming language
-            test_input: Input for the test case (optional)
             
         Returns:
             Tuple of (output, execution_time, error)
         """
         # Create temporary files for code and input
-        with tempfile.TemporaryDirectory() as tmpdir:
-            start_time = asyncio.get_event_loop().time()
+        scratch_dir = None if SCRATCH_NOEXEC and language in ["c", "cpp", "c++"] else SCRATCH_DIR
+        tmpdir = tempfile.mkdtemp(dir=scratch_dir)
+        try:
+            start_time = time.perf_counter()
+            
+            # Encoded once for the file write, the build cache key and compiler stdin
+            code_bytes = code.encode("utf-8")
             
             # Save code to file
             file_extension = self._get_file_extension(language)
-            code_file = os.path.join(tmpdir, f"solution.{file_extension}")
+            if language == "java":
+                # javac requires a public class to live in a file of the same name
+                class_match = JAVA_PUBLIC_CLASS_RE.search(code)
+                class_name = class_match.group(1) if class_match else "Solution"
+                code_file = os.path.join(tmpdir, f"{class_name}.{file_extension}")
+            else:
+                code_file = os.path.join(tmpdir, f"solution.{file_extension}")
             
-            with open(code_file, "w") as f:
-                f.write(code)
+            # C/C++ sources are piped straight into the compiler instead
+            if language not in ["c", "cpp", "c++"]:
+                with open(code_file, "wb") as f:
+                    f.write(code_bytes)
             
             # Execute code based on language
             try:
@@ -115,30 +283,47 @@ class TesterAgent(Agent):
                 elif language in ["javascript", "nodejs"]:
                     cmd = ["node", code_file]
                 elif language == "java":
-                    # Compile first
-                    subprocess.run(["javac", code_file], check=True, timeout=10)
-                    class_name = "Solution"  # Assume main class is Solution
-                    cmd = ["java", "-cp", tmpdir, class_name]
+                    # Compile first, unless this exact source was built before
+                    build_dir = self._cached_build(code_bytes, language)
+                    if build_dir is None:
+                        await self._run_process(
+                            ["javac", *(f"-J{flag}" for flag in JVM_FAST_START_FLAGS), code_file],
+                            tmpdir,
+                            check=True
+                        )
+                        # Copying and pruning touch many files; keep them off the event loop
+                        build_dir = await asyncio.get_running_loop().run_in_executor(
+                            None, partial(self._store_build, tmpdir, code_bytes, language, code_file)
+                        )
+                    cmd = ["java", *JVM_FAST_START_FLAGS, "-cp", build_dir, class_name]
                 elif language in ["c", "cpp", "c++"]:
-                    output_exe = os.path.join(tmpdir, "solution")
-                    if language == "c":
-                        subprocess.run(["gcc", code_file, "-o", output_exe], check=True, timeout=10)
-                    else:
-                        subprocess.run(["g++", code_file, "-o", output_exe], check=True, timeout=10)
-                    cmd = [output_exe]
+                    build_dir = self._cached_build(code_bytes, language)
+                    if build_dir is None:
+                        output_exe = os.path.join(tmpdir, "solution")
+                        # -pipe keeps intermediate assembly in memory; source is read from stdin
+                        if language == "c":
+                            compile_cmd = ["gcc", "-pipe", "-x", "c", "-", "-o", output_exe]
+                        else:
+                            compile_cmd = ["g++", "-pipe", "-x", "c++", "-", "-o", output_exe]
+                        await self._run_process(compile_cmd, tmpdir, check=True, input_data=code_bytes)
+                        # Copying and pruning touch many files; keep them off the event loop
+                        build_dir = await asyncio.get_running_loop().run_in_executor(
+                            None, partial(self._store_build, tmpdir, code_bytes, language, code_file)
+                        )
+                    cmd = [os.path.join(build_dir, "solution")]
                 else:
                     # Default to Python for unknown languages
                     cmd = [sys.executable, code_file]
         
                 # Run without input for self-contained test scripts
-                process = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=10  # 10 second timeout for test execution
-                )
+                # The JVM and V8 reserve far more address space than they use,
+                # so only interpreters and native binaries get a memory cap
+                limit_memory = language not in ["java", "javascript", "nodejs"]
+                
+                # Keep files the test writes out of the server's working directory
+                process = await self._run_process(cmd, tmpdir, limit_memory=limit_memory)
                     
-                end_time = asyncio.get_event_loop().time()
+                end_time = time.perf_counter()
                 execution_time = (end_time - start_time) * 1000  # Convert to ms
 
                 logger.info(f"Process: {process}")
@@ -154,20 +339,15 @@ class TesterAgent(Agent):
                 if process.returncode != 0:
                     # Python - ModuleNotFoundError
                     if language.lower() in ["python", "py"] and "ModuleNotFoundError" in stderr_content:
-                        module_match = re.search(r"ModuleNotFoundError: No module named ['\"]([^'\"]+)['\"]", stderr_content)
+                        module_match = PYTHON_MISSING_MODULE_RE.search(stderr_content)
                         if module_match:
                             missing_module = module_match.group(1)
                             logger.info(f"Đã phát hiện module Python thiếu: {missing_module}. Thử cài đặt...")
-                            success, message = self._install_missing_module(missing_module, language)
+                            success, message = await self._install_missing_module(missing_module, language)
                             
                             if success:
                                 logger.info(f"Đã cài đặt thành công {missing_module}, chạy lại code...")
-                                process = subprocess.run(
-                                    cmd,
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=10
-                                )
+                                process = await self._run_process(cmd, tmpdir, limit_memory=limit_memory)
                                 # Cập nhật kết quả đầu ra
                                 stdout_content = process.stdout if process.stdout else ""
                                 stderr_content = process.stderr if process.stderr else ""
@@ -175,20 +355,15 @@ class TesterAgent(Agent):
                     
                     # JavaScript/Node.js - Cannot find module
                     elif language.lower() in ["javascript", "js", "nodejs", "node"] and "Cannot find module" in stderr_content:
-                        module_match = re.search(r"Cannot find module ['\"]([^'\"]+)['\"]", stderr_content)
+                        module_match = NODE_MISSING_MODULE_RE.search(stderr_content)
                         if module_match:
                             missing_module = module_match.group(1)
                             logger.info(f"Đã phát hiện package Node.js thiếu: {missing_module}. Thử cài đặt...")
-                            success, message = self._install_missing_module(missing_module, language)
+                            success, message = await self._install_missing_module(missing_module, language)
                             
                             if success:
                                 logger.info(f"Đã cài đặt thành công {missing_module}, chạy lại code...")
-                                process = subprocess.run(
-                                    cmd,
-                                    capture_output=True,
-                                    text=True,
-                                    timeout=10
-                                )
+                                process = await self._run_process(cmd, tmpdir, limit_memory=limit_memory)
                                 # Cập nhật kết quả đầu ra
                                 stdout_content = process.stdout if process.stdout else ""
                                 stderr_content = process.stderr if process.stderr else ""
@@ -196,7 +371,7 @@ class TesterAgent(Agent):
                     
                     # Java - ClassNotFoundException/NoClassDefFoundError
                     elif language.lower() == "java" and ("ClassNotFoundException" in stderr_content or "NoClassDefFoundError" in stderr_content):
-                        class_match = re.search(r"(ClassNotFoundException|NoClassDefFoundError): ([A-Za-z0-9_.]+)", stderr_content)
+                        class_match = JAVA_MISSING_CLASS_RE.search(stderr_content)
                         if class_match:
                             missing_class = class_match.group(2)
                             logger.info(f"Đã phát hiện class Java thiếu: {missing_class}. Cố gắng xác định package...")
@@ -207,16 +382,11 @@ class TesterAgent(Agent):
                             if len(parts) > 1:
                                 potential_package = '.'.join(parts[:-1])
                                 logger.info(f"Thử cài đặt package: {potential_package}")
-                                success, message = self._install_missing_module(potential_package, language)
+                                success, message = await self._install_missing_module(potential_package, language)
                                 
                                 if success:
                                     # Chạy lại nếu thành công
-                                    process = subprocess.run(
-                                        cmd,
-                                        capture_output=True, 
-                                        text=True,
-                                        timeout=10
-                                    )
+                                    process = await self._run_process(cmd, tmpdir, limit_memory=limit_memory)
                                     stdout_content = process.stdout if process.stdout else ""
                                     stderr_content = process.stderr if process.stderr else ""
                                     combined_output = stdout_content + stderr_content
@@ -237,20 +407,201 @@ class TesterAgent(Agent):
                 return combined_output.strip(), execution_time, execution_error
                 
             except subprocess.TimeoutExpired:
-                return "", 10000, "Execution timed out after 10 seconds"
+                return "", EXECUTION_TIMEOUT * 1000, f"Execution timed out after {EXECUTION_TIMEOUT} seconds"
             except subprocess.CalledProcessError as e:
                 error_msg = e.stderr if hasattr(e, 'stderr') else str(e)
                 return "", 0, f"Execution failed: {error_msg}"
             except Exception as e:
                 return "", 0, f"Error: {str(e)}"
+        finally:
+            # Remove scratch files in a worker thread so the event loop is not held up
+            asyncio.get_running_loop().run_in_executor(None, partial(shutil.rmtree, tmpdir, ignore_errors=True))
             
-    async def _generate_test_cases_code(self, requirements: str, code: str, language: str) -> str:
+    async def _run_process(
+        self,
+        cmd: List[str],
+        cwd: str,
+        check: bool = False,
+        limit_memory: bool = False,
+        input_data: Optional[bytes] = None
+    ) -> subprocess.CompletedProcess:
+        """Run a process without blocking the event loop.
+        
+        Output is read in chunks and capped at MAX_OUTPUT_SIZE per stream; a process
+        that prints more than that is killed. The whole run is bounded by
+        EXECUTION_TIMEOUT, and on Linux the child also gets a matching CPU time rlimit.
+        
+        Args:
+            cmd: Command and arguments
+            cwd: Working directory for the process
+            check: Raise CalledProcessError on a non-zero exit code
+            limit_memory: Cap the child's address space at settings.TEST_MEMORY_LIMIT_MB
+            input_data: Bytes to write to the process's stdin
+            
+        Returns:
+            CompletedProcess with decoded stdout and stderr
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if input_data is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd
+        )
+        if resource:
+            _apply_rlimits(process.pid, limit_memory)
+        
+        def kill():
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        
+        async def bounded_read(stream: asyncio.StreamReader) -> bytes:
+            data = bytearray()
+            while True:
+                chunk = await stream.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data += chunk
+                if len(data) > MAX_OUTPUT_SIZE:
+                    logger.warning(f"Output of {cmd[0]} exceeded {MAX_OUTPUT_SIZE} bytes, killing process")
+                    kill()
+                    del data[MAX_OUTPUT_SIZE:]
+                    break
+            return bytes(data)
+        
+        async def feed_stdin() -> None:
+            try:
+                process.stdin.write(input_data)
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            process.stdin.close()
+        
+        async def communicate() -> list:
+            readers = [bounded_read(process.stdout), bounded_read(process.stderr)]
+            if input_data is not None:
+                readers.append(feed_stdin())
+            results = await asyncio.gather(*readers)
+            # A child can close its output and keep running, so the exit is bounded too
+            await process.wait()
+            return results
+        
+        try:
+            stdout, stderr, *_ = await asyncio.wait_for(communicate(), timeout=EXECUTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(cmd, EXECUTION_TIMEOUT)
+        except BaseException:
+            kill()
+            raise
+        
+        result = subprocess.CompletedProcess(
+            cmd,
+            process.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace")
+        )
+        if check:
+            result.check_returncode()
+        return result
+    
+    def _build_cache_path(self, root: str, code: bytes, language: str) -> str:
+        """Get the build cache directory for a piece of source code.
+        
+        Args:
+            root: Build cache root from _build_cache_root
+            code: The UTF-8 encoded source code to compile
+            language: Programming language
+            
+        Returns:
+            Path of the cache entry (may not exist yet)
+        """
+        key = hashlib.sha256(code).hexdigest()
+        return os.path.join(root, language, key)
+    
+    def _cached_build(self, code: bytes, language: str) -> Optional[str]:
+        """Look up compiled artifacts for a piece of source code.
+        
+        Args:
+            code: The UTF-8 encoded source code
+            language: Programming language
+            
+        Returns:
+            Directory to run the compiled program from, or None on a miss
+        """
+        root = _build_cache_root()
+        if root is None:
+            return None
+        cache_path = self._build_cache_path(root, code, language)
+        try:
+            # Mark the entry as recently used for pruning
+            os.utime(cache_path)
+        except OSError:
+            return None
+        return cache_path
+    
+    def _store_build(self, build_dir: str, code: bytes, language: str, source_file: str) -> str:
+        """Move freshly compiled artifacts into the build cache.
+        
+        The artifacts are staged next to the cache entry and renamed into place,
+        so concurrent runs never see a partially written entry. Old entries are
+        pruned afterwards. This blocks on file I/O, so run it in an executor.
+        
+        Args:
+            build_dir: Directory the compiler wrote its output to
+            code: The UTF-8 encoded source code that was compiled
+            language: Programming language
+            source_file: Source file to leave out of the cache
+            
+        Returns:
+            Directory to run the compiled program from
+        """
+        root = _build_cache_root()
+        if root is None:
+            return build_dir
+        cache_path = self._build_cache_path(root, code, language)
+        try:
+            os.makedirs(os.path.dirname(cache_path), mode=0o700, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=os.path.dirname(cache_path))
+        except OSError as e:
+            logger.warning(f"Build cache unavailable: {e}")
+            return build_dir
+        try:
+            for name in os.listdir(build_dir):
+                path = os.path.join(build_dir, name)
+                if path != source_file and os.path.isfile(path):
+                    shutil.copy2(path, staging)
+            os.rename(staging, cache_path)
+        except OSError:
+            # Another run stored the same build first, or the copy failed
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(cache_path):
+                return build_dir
+        
+        try:
+            _prune_build_cache(root)
+        except OSError as e:
+            logger.warning(f"Could not prune build cache: {e}")
+        return cache_path
+    
+    async def _generate_test_cases_code(
+        self,
+        requirements: str,
+        code: str,
+        language: str,
+        test_cases: Optional[List[Dict[str, Any]]] = None
+    ) -> str:
         """Generate a complete test script with solution code and test cases.
         
         Args:
             requirements: The problem requirements 
             code: The generated code solution
             language: The programming language
+            test_cases: Test cases already extracted from the requirements, if the
+                caller has them; extracted here otherwise
             
         Returns:
             A complete test script with solution code and test cases
@@ -258,8 +609,9 @@ class TesterAgent(Agent):
         logger.info(f"Generating test cases for the {language} code solution")
 
         # First extract any explicit test cases from the requirements
-        test_cases = self._extract_test_cases_from_requirements(requirements)
-        logger.info(f"Test cases extracted:\n {test_cases}")
+        if test_cases is None:
+            test_cases = self._extract_test_cases_from_requirements(requirements)
+            logger.info(f"Test cases extracted:\n {test_cases}")
         
         try:
             # Prepare language-specific instructions for testing
@@ -389,9 +741,7 @@ class TesterAgent(Agent):
         test_cases = []
         
         # Common test case patterns
-        # Cải thiện mẫu regex để chỉ lấy kết quả thực tế, không bao gồm phần giải thích
-        example_pattern = r"Example[s]?[\s\d]*:[\s\n]*(Input[\s\n]*:[\s\n]*(.+?)[\s\n]*Output[\s\n]*:[\s\n]*([^\n\r]+))"
-        example_matches = re.finditer(example_pattern, requirements, re.DOTALL | re.IGNORECASE)
+        example_matches = EXAMPLE_RE.finditer(requirements)
         
         for i, match in enumerate(example_matches):
             test_cases.append({
@@ -400,9 +750,7 @@ class TesterAgent(Agent):
                 "expected_output": match.group(3).strip()
             })
         
-        # Test case pattern with "=>"
-        test_case_pattern = r"Test Case[\s\d]*:[\s\n]*(.+?)[\s\n]*=>[\s\n]*([^\n\r]+)"
-        test_case_matches = re.finditer(test_case_pattern, requirements, re.DOTALL | re.IGNORECASE)
+        test_case_matches = TEST_CASE_RE.finditer(requirements)
         
         for i, match in enumerate(test_case_matches):
             test_cases.append({
@@ -441,9 +789,11 @@ class TesterAgent(Agent):
         
         return extensions.get(language.lower(), "txt")
         
-    def _install_missing_module(self, module_name: str, language: str = "python") -> tuple:
+    async def _install_missing_module(self, module_name: str, language: str = "python") -> tuple:
         """Cài đặt module/package/thư viện thiếu.
         
+        The package manager runs in a worker thread so the event loop is not held up.
+        
         Args:
             module_name: Tên module cần cài đặt
             language: Ngôn ngữ lập trình (python, javascript, java, v.v.)
@@ -456,7 +806,8 @@ class TesterAgent(Agent):
             # Xử lý theo từng ngôn ngữ
             if language.lower() in ["python", "py"]:
                 # Cài đặt package bằng pip
-                process = subprocess.run(
+                process = await asyncio.to_thread(
+                    subprocess.run,
                     [sys.executable, "-m", "pip", "install", module_name],
                     capture_output=True,
                     text=True,
@@ -465,7 +816,8 @@ class TesterAgent(Agent):
                 
             elif language.lower() in ["javascript", "js", "nodejs", "node"]:
                 # Cài đặt package bằng npm
-                process = subprocess.run(
+                process = await asyncio.to_thread(
+                    subprocess.run,
                     ["npm", "install", module_name],
                     capture_output=True,
                     text=True,
@@ -477,7 +829,8 @@ class TesterAgent(Agent):
                 # Nhưng chúng ta có thể xử lý với Maven nếu có file pom.xml
                 if os.path.exists("pom.xml"):
                     # Trường hợp dùng Maven
-                    process = subprocess.run(
+                    process = await asyncio.to_thread(
+                        subprocess.run,
                         ["mvn", "dependency:get", f"-Dartifact=:{module_name}:RELEASE"],
                         capture_output=True,
                         text=True,
@@ -1,22 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.database import get_db
 from ...db.models import User
 from ...models.auth import UserCreate, UserResponse, UserUpdate, Token
-from ...auth.utils import verify_password, get_password_hash, create_access_token
-from ...auth.deps import get_current_active_user
+from ...auth.utils import averify_password, aget_password_hash, create_access_token
+from ...auth.deps import get_current_active_user, CachedUser, USER_CACHE
 
 router = APIRouter()
 
 @router.post("/register", response_model=Token, status_code=201)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user
     """
     # Check if username exists
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = (await db.execute(select(User).where(User.username == user.username))).scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -24,7 +25,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
         
     # Check if email exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -32,7 +33,7 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await aget_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -41,8 +42,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     # Create tokens
     access_token = create_access_token(data={"sub": user.username})
@@ -57,16 +58,16 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
     """
     # Find user by username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = (await db.execute(select(User).where(User.username == form_data.username))).scalar_one_or_none()
     
     # Check if user exists and password is correct
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await averify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -84,46 +85,53 @@ async def login(
     }
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Get current user information
     """
-    return current_user
+    # The auth dependency only carries id/username/is_active; load the full profile
+    return await db.get(User, current_user.id)
 
 @router.put("/me", response_model=UserResponse)
 async def update_user_me(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update own user information
     """
+    user = await db.get(User, current_user.id)
+    
     # Update user fields if provided
     if user_update.email:
         # Check if email is already taken
-        email_exists = db.query(User).filter(
+        email_exists = (await db.execute(select(User).where(
             User.email == user_update.email, 
             User.id != current_user.id
-        ).first()
+        ))).scalar_one_or_none()
         if email_exists:
             raise HTTPException(
                 status_code=400,
                 detail="Email already registered"
             )
-        current_user.email = user_update.email
+        user.email = user_update.email
     
     if user_update.full_name:
-        current_user.full_name = user_update.full_name
+        user.full_name = user_update.full_name
     
     if user_update.avatar:
-        current_user.avatar = user_update.avatar
+        user.avatar = user_update.avatar
     
     if user_update.password:
-        current_user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = await aget_password_hash(user_update.password)
     
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    USER_CACHE.pop(user.username, None)
     
-    return current_user
\ No newline at end of file
+    return user
\ No newline at end of file
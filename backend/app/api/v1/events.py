@@ -4,16 +4,19 @@ This module defines the API routes for Server-Sent Events (SSE) for real-time up
 """
 
 from fastapi import APIRouter, Request, Response, Depends
-from sse_starlette.sse import EventSourceResponse
-from typing import Dict
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+from starlette.types import Receive, Scope, Send
+from typing import Dict, List, Tuple
+from collections import deque
+from functools import partial
+import anyio
 import asyncio
 import logging
-import json
+import orjson
 import uuid
 from datetime import datetime
 
-from ...auth.deps import get_current_active_user, get_current_user, oauth2_scheme, get_user_from_token_param
-from ...db.models import User
+from ...auth.deps import get_current_active_user, get_current_user, oauth2_scheme, get_user_from_token_param, CachedUser
 from ...db.database import get_db
 from ...models.models import TaskStatus
 
@@ -23,8 +26,88 @@ logger = logging.getLogger("api.events")
 # Create router 
 router = APIRouter()
 
-# Store active connections by user ID and client ID
-ACTIVE_CONNECTIONS: Dict[str, Dict[str, asyncio.Queue]] = {}
+# Number of recent updates kept per user; readers that fall further behind skip ahead
+BROADCAST_BUFFER_SIZE = 256
+
+# Seconds of inactivity after which a keepalive ping is sent
+PING_INTERVAL = 15.0
+
+
+class EventSourceResponseNoPing(EventSourceResponse):
+    """EventSourceResponse without sse-starlette's built-in ping task.
+    
+    The task update streams send their own keepalives, so the library's ping
+    loop, which contends with the stream for the send lock, is not started.
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async with anyio.create_task_group() as task_group:
+            async def wrap(func) -> None:
+                await func()
+                task_group.cancel_scope.cancel()
+            
+            task_group.start_soon(wrap, partial(self.stream_response, send))
+            task_group.start_soon(wrap, self.listen_for_exit_signal)
+            await wrap(partial(self.listen_for_disconnect, receive))
+        
+        if self.background is not None:
+            await self.background()
+
+
+class UserBroadcast:
+    """Ring buffer of encoded task update events shared by all SSE connections of one user.
+    
+    Publishing appends once and wakes every reader without awaiting; each reader
+    keeps its own cursor into the monotonically increasing sequence number. A
+    reader that falls more than `maxlen` events behind loses the oldest ones and
+    resumes from the buffered tail.
+    """
+    
+    def __init__(self, maxlen: int = BROADCAST_BUFFER_SIZE):
+        self.buffer: deque = deque(maxlen=maxlen)
+        self.seq = 0
+        self.connections = 0
+        self._updated = asyncio.Event()
+    
+    def publish(self, message: bytes) -> None:
+        """Append a message and wake all waiting readers."""
+        self.buffer.append(message)
+        self.seq += 1
+        # Swap in a fresh event so readers that wake up wait on the next publish
+        updated, self._updated = self._updated, asyncio.Event()
+        updated.set()
+    
+    async def wait_for_update(self, last_seen: int) -> None:
+        """Wait until a message newer than `last_seen` has been published."""
+        while self.seq <= last_seen:
+            await self._updated.wait()
+    
+    def read_since(self, last_seen: int) -> Tuple[List[bytes], int]:
+        """Return the buffered messages published after `last_seen` and the new cursor."""
+        missed = self.seq - last_seen
+        if missed <= 0:
+            return [], last_seen
+        if missed > len(self.buffer):
+            logger.warning("SSE reader fell behind; dropped %d task updates", missed - len(self.buffer))
+            return list(self.buffer), self.seq
+        return list(self.buffer)[-missed:], self.seq
+
+
+# Store active broadcasts by user ID
+ACTIVE_CONNECTIONS: Dict[str, UserBroadcast] = {}
+
+# Keep the stream open and stop proxies such as Nginx from buffering events
+SSE_HEADERS = {
+    "Connection": "keep-alive",
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+# Initial confirmation event, identical for every connection
+CONNECTED_EVENT = ServerSentEvent(
+    data=orjson.dumps({"message": "Connected to task updates stream"}).decode(),
+    event="connected"
+).encode()
 
 async def task_status_update(task_id: str, user_id: int, status: TaskStatus, detailed_status: dict = None):
     """
@@ -38,72 +121,63 @@ async def task_status_update(task_id: str, user_id: int, status: TaskStatus, det
     """
     try:
         user_id_str = str(user_id)
-        if user_id_str in ACTIVE_CONNECTIONS:
-            # Prepare the message
-            message = {
-                "task_id": task_id,
-                "status": status,
-                "detailed_status": detailed_status or {}
-            }
-            
-            # Log more details about the update being sent
-            logger.info(f"Sending task update for task {task_id} to user {user_id}, phase: {detailed_status.get('phase') if detailed_status else 'unknown'}")
+        broadcast = ACTIVE_CONNECTIONS.get(user_id_str)
+        if broadcast is not None:
+            # Prepare the SSE frame, encoded once and shared by all connections
+            message = ServerSentEvent(
+                data=orjson.dumps({
+                    "task_id": task_id,
+                    "status": status,
+                    "detailed_status": detailed_status or {}
+                }).decode(),
+                event="task_update"
+            ).encode()
             
-            # Count active connections for this user
-            connection_count = len(ACTIVE_CONNECTIONS[user_id_str])
-            if connection_count == 0:
-                logger.warning(f"No active connections for user {user_id_str}")
-                return
-                
-            # Send to all connections for this user
-            for client_id, client_queue in ACTIVE_CONNECTIONS[user_id_str].items():
-                try:
-                    await client_queue.put(message)
-                    logger.debug(f"Task update put in queue for client {client_id}")
-                except Exception as client_error:
-                    logger.error(f"Error sending to client {client_id}: {str(client_error)}")
+            # One non-blocking append wakes every connection of this user
+            broadcast.publish(message)
             
-            logger.info(f"Task update sent for task {task_id} to user {user_id} ({connection_count} connections)")
+            if logger.isEnabledFor(logging.DEBUG):
+                phase = detailed_status.get("phase") if detailed_status else "unknown"
+                logger.debug("Task update sent for task %s to user %s, phase: %s (%d connections)", task_id, user_id, phase, broadcast.connections)
         else:
-            logger.warning(f"No active connections found for user {user_id}")
+            logger.debug("No active connections found for user %s", user_id)
     except Exception as e:
         logger.error(f"Error in task_status_update: {str(e)}")
 
-@router.get("/task-updates")
-async def task_updates(
-    request: Request, 
-    current_user: User = Depends(get_current_active_user)
-):
+async def _sse_handler(request: Request, user_id: str) -> EventSourceResponseNoPing:
     """
-    Endpoint for SSE task updates with token in header.
+    Build the SSE response shared by both task update endpoints.
     
     Args:
         request: The HTTP request
-        current_user: The authenticated user from authorization header
+        user_id: ID of the authenticated user
         
     Returns:
         EventSourceResponse for SSE events
     """
-    user_id = str(current_user.id)
     client_id = str(uuid.uuid4())
     
-    # Initialize user's connection dictionary if it doesn't exist
-    if user_id not in ACTIVE_CONNECTIONS:
-        ACTIVE_CONNECTIONS[user_id] = {}
+    # Join the user's broadcast, creating it for the first connection
+    broadcast = ACTIVE_CONNECTIONS.get(user_id)
+    if broadcast is None:
+        broadcast = ACTIVE_CONNECTIONS[user_id] = UserBroadcast()
+    broadcast.connections += 1
     
-    # Create a queue for this connection
-    queue = asyncio.Queue()
-    ACTIVE_CONNECTIONS[user_id][client_id] = queue
+    # Only deliver updates published after this connection was opened. Captured here,
+    # not in the generator, so updates sent while the first event is in flight aren't lost
+    last_seen = broadcast.seq
     
     logger.info(f"New SSE connection established for user {user_id}, client {client_id}")
     
     async def event_generator():
+        nonlocal last_seen
+        waiter = None
         try:
             # Send initial connection confirmation
-            yield {
-                "event": "connected",
-                "data": json.dumps({"message": "Connected to task updates stream"})
-            }
+            yield CONNECTED_EVENT
+            
+            loop = asyncio.get_running_loop()
+            ping_deadline = loop.time() + PING_INTERVAL
             
             # Wait for messages
             while True:
@@ -111,38 +185,60 @@ async def task_updates(
                     logger.info(f"Client {client_id} disconnected")
                     break
                 
-                try:
-                    # Wait for a message with a timeout
-                    message = await asyncio.wait_for(queue.get(), timeout=1.0)
-                    yield {
-                        "event": "task_update",
-                        "data": json.dumps(message)
-                    }
-                    logger.debug(f"SSE message sent to client {client_id}")
-                except asyncio.TimeoutError:
-                    # Send a keepalive message every second
-                    yield {
-                        "event": "ping",
-                        "data": json.dumps({"timestamp": datetime.now().isoformat()})
-                    }
-                    logger.debug(f"Ping sent to client {client_id}")
+                if waiter is None:
+                    waiter = asyncio.ensure_future(broadcast.wait_for_update(last_seen))
+                
+                # Wait for new messages until the next ping is due; no exception on timeout
+                done, _ = await asyncio.wait({waiter}, timeout=max(0.0, ping_deadline - loop.time()))
+                if done:
+                    waiter = None
+                    messages, last_seen = broadcast.read_since(last_seen)
+                    for message in messages:
+                        yield message
+                    logger.debug("SSE messages sent to client %s", client_id)
+                else:
+                    # Send a keepalive message after PING_INTERVAL seconds without updates
+                    yield ServerSentEvent(
+                        data=orjson.dumps({"timestamp": datetime.now()}).decode(),
+                        event="ping"
+                    )
+                    logger.debug("Ping sent to client %s", client_id)
+                ping_deadline = loop.time() + PING_INTERVAL
         except Exception as e:
             logger.error(f"Error in SSE stream: {str(e)}")
         finally:
             # Clean up connection when done
-            if user_id in ACTIVE_CONNECTIONS and client_id in ACTIVE_CONNECTIONS[user_id]:
-                del ACTIVE_CONNECTIONS[user_id][client_id]
-                if not ACTIVE_CONNECTIONS[user_id]:
-                    del ACTIVE_CONNECTIONS[user_id]
-                logger.info(f"Removed SSE connection for user {user_id}, client {client_id}")
+            if waiter is not None:
+                waiter.cancel()
+            broadcast.connections -= 1
+            if broadcast.connections <= 0 and ACTIVE_CONNECTIONS.get(user_id) is broadcast:
+                del ACTIVE_CONNECTIONS[user_id]
+            logger.info(f"Removed SSE connection for user {user_id}, client {client_id}")
+    
+    return EventSourceResponseNoPing(event_generator(), headers=SSE_HEADERS)
+
+@router.get("/task-updates")
+async def task_updates(
+    request: Request, 
+    current_user: CachedUser = Depends(get_current_active_user)
+):
+    """
+    Endpoint for SSE task updates with token in header.
     
-    return EventSourceResponse(event_generator())
+    Args:
+        request: The HTTP request
+        current_user: The authenticated user from authorization header
+        
+    Returns:
+        EventSourceResponse for SSE events
+    """
+    return await _sse_handler(request, str(current_user.id))
 
 @router.get("/task-updates-token")
 async def task_updates_with_token(
     request: Request,
     token: str,
-    current_user: User = Depends(get_user_from_token_param)
+    current_user: CachedUser = Depends(get_user_from_token_param)
 ):
     """
     Endpoint for SSE task updates with token in query parameter.
@@ -156,56 +252,4 @@ async def task_updates_with_token(
     Returns:
         EventSourceResponse for SSE events
     """
-    user_id = str(current_user.id)
-    client_id = str(uuid.uuid4())
-    
-    # Initialize user's connection dictionary if it doesn't exist
-    if user_id not in ACTIVE_CONNECTIONS:
-        ACTIVE_CONNECTIONS[user_id] = {}
-    
-    # Create a queue for this connection
-    queue = asyncio.Queue()
-    ACTIVE_CONNECTIONS[user_id][client_id] = queue
-    
-    logger.info(f"New SSE connection established for user {user_id}, client {client_id}")
-    
-    async def event_generator():
-        try:
-            # Send initial connection confirmation
-            yield {
-                "event": "connected",
-                "data": json.dumps({"message": "Connected to task updates stream"})
-            }
-            
-            # Wait for messages
-            while True:
-                if await request.is_disconnected():
-                    logger.info(f"Client {client_id} disconnected")
-                    break
-                
-                try:
-                    # Wait for a message with a timeout
-                    message = await asyncio.wait_for(queue.get(), timeout=1.0)
-                    yield {
-                        "event": "task_update",
-                        "data": json.dumps(message)
-                    }
-                    logger.debug(f"SSE message sent to client {client_id}")
-                except asyncio.TimeoutError:
-                    # Send a keepalive message every second
-                    yield {
-                        "event": "ping",
-                        "data": json.dumps({"timestamp": datetime.now().isoformat()})
-                    }
-                    logger.debug(f"Ping sent to client {client_id}")
-        except Exception as e:
-            logger.error(f"Error in SSE stream: {str(e)}")
-        finally:
-            # Clean up connection when done
-            if user_id in ACTIVE_CONNECTIONS and client_id in ACTIVE_CONNECTIONS[user_id]:
-                del ACTIVE_CONNECTIONS[user_id][client_id]
-                if not ACTIVE_CONNECTIONS[user_id]:
-                    del ACTIVE_CONNECTIONS[user_id]
-                logger.info(f"Removed SSE connection for user {user_id}, client {client_id}")
-    
-    return EventSourceResponse(event_generator())
+    return await _sse_handler(request, str(current_user.id))
@@ -6,15 +6,18 @@ This module defines the API routes for updating and retrieving application setti
 from fastapi import APIRouter, Body, HTTPException, Depends, Request, Response, status
 from fastapi.routing import APIRoute
 from pydantic import BaseModel
-from typing import Optional, Callable, Any, Dict
+from typing import Optional, Callable, Any, Dict, List, Tuple
 import os
+import errno
+import asyncio
 import logging
 import json
 from dotenv import load_dotenv, set_key
 from pathlib import Path
 from ...core.config import settings, ROOT_DIR, reload_settings
-from ...auth.deps import get_current_active_user, get_current_user
-from ...db.models import User
+from ...core.orchestrator import get_orchestrator
+from ...db.database import engine
+from ...auth.deps import get_current_active_user, get_current_user, CachedUser
 from ...models.models import SettingsUpdateRequest
 
 # Configure logging
@@ -26,12 +29,96 @@ router = APIRouter()
 # ENV file path
 ENV_FILE = os.path.join(ROOT_DIR, ".env")
 
+# Refuse to load anything bigger than this as .env
+MAX_ENV_FILE_SIZE = 1024 * 1024
+
+# Last read .env content, reused until the file's mtime changes
+ENV_CACHE: Dict[str, Any] = {"mtime_ns": None, "content": ""}
+
+
+def load_env_content(env_path: Path) -> str:
+    """Read the .env file, serving it from ENV_CACHE while unchanged on disk.
+    
+    Args:
+        env_path: Path of the .env file
+        
+    Returns:
+        The file content
+        
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is larger than MAX_ENV_FILE_SIZE
+    """
+    stat = os.stat(env_path)
+    if ENV_CACHE["mtime_ns"] != stat.st_mtime_ns:
+        if stat.st_size > MAX_ENV_FILE_SIZE:
+            raise ValueError(f".env file is larger than {MAX_ENV_FILE_SIZE} bytes")
+        # One unbuffered read of the whole file
+        ENV_CACHE["content"] = env_path.read_bytes().decode("utf-8", "replace")
+        ENV_CACHE["mtime_ns"] = stat.st_mtime_ns
+    return ENV_CACHE["content"]
+
+
+def write_env_file(env_path: Path, content: str) -> None:
+    """Replace the .env file's content, without readers ever seeing a partial file.
+    
+    The content is written to a temp file in the same directory, fsynced and renamed
+    over the original. When the file is a bind mount (docker-compose mounts
+    ./.env:/app/.env) it can't be renamed over, so it is rewritten in place instead.
+    
+    Args:
+        env_path: Path of the .env file
+        content: The new file content
+        
+    Raises:
+        OSError: If the file can't be written
+    """
+    tmp_path = env_path.with_name(env_path.name + ".tmp")
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.replace(tmp_path, env_path)
+        except OSError as e:
+            if e.errno not in (errno.EBUSY, errno.EXDEV):
+                raise
+            # Rename target is a mount point; truncate and rewrite the original inode
+            with open(env_path, 'w') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def parse_env_lines(text: str) -> List[Tuple[Optional[str], Optional[str], str]]:
+    """Split .env content into (key, value, raw_line) entries.
+    
+    Comments, blank lines and lines without '=' are kept as (None, None, raw_line)
+    so the file can be written back unchanged apart from updated keys.
+    """
+    entries = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and '=' in stripped:
+            key, value = stripped.split('=', 1)
+            entries.append((key.strip(), value.strip(), line))
+        else:
+            entries.append((None, None, line))
+    return entries
+
 
 @router.post("/", response_model=dict)
 async def update_settings(
     request: Request, 
     data: SettingsUpdateRequest = Body(...),
-    current_user: User = Depends(get_current_active_user)
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """Update application settings.
     
@@ -45,41 +132,43 @@ async def update_settings(
     """
     try:
         logger.info(f"User {current_user.username} is updating application settings")
-        logger.info(f"Request headers: {request.headers}")
-        logger.info(f"Request body (settings to update): {data}")
+        logger.debug("Request headers: %s", request.headers)
+        # Only the field names; the values are API keys
+        logger.debug("Settings to update: %s", data.model_fields_set)
         
-        # Ensure .env file exists
         env_path = Path(ENV_FILE)
-        logger.info(f"ENV file path: {env_path}, exists: {env_path.exists()}")
+        logger.debug("ENV file path: %s", env_path)
         
-        if not env_path.exists():
-            logger.warning(f"ENV file does not exist, creating at: {env_path}")
-            with open(env_path, 'w') as f:
-                f.write("# Application Settings\n")
-        
-        # Load current env content
+        # Load current env content; a missing file is created by the write below
         try:
-            with open(env_path, 'r') as f:
-                env_content = f.read()
-            logger.info(f"Current .env content exists with {len(env_content)} characters")
+            env_content = load_env_content(env_path)
+            logger.debug("Current .env content has %d characters", len(env_content))
+        except FileNotFoundError:
+            logger.warning(f"ENV file does not exist, it will be created at: {env_path}")
+            env_content = "# Application Settings\n"
+        except ValueError:
+            # Never replace an unexpectedly large file with just the updated keys
+            raise
         except Exception as e:
             logger.error(f"Error reading .env file: {str(e)}")
             env_content = "# Application Settings\n"
         
+        # Parse once; keys are updated in place and the file is serialized once at the end
+        env_lines = parse_env_lines(env_content)
+        env_index = {key: i for i, (key, _, _) in enumerate(env_lines) if key}
+        
         # Function to update .env file directly
         def update_env_var(key, value):
-            nonlocal env_content
-            import re
-            # Check if key exists
-            pattern = rf'^{key}=.*$'
-            if re.search(pattern, env_content, re.MULTILINE):
+            entry = (key, value, f'{key}={value}')
+            if key in env_index:
                 # Update existing key
                 logger.info(f"Updating existing key: {key}")
-                env_content = re.sub(pattern, f'{key}={value}', env_content, flags=re.MULTILINE)
+                env_lines[env_index[key]] = entry
             else:
                 # Add new key
                 logger.info(f"Adding new key: {key}")
-                env_content += f'\n{key}={value}'
+                env_index[key] = len(env_lines)
+                env_lines.append(entry)
         
         # Update settings based on request
         changes_made = False
@@ -91,7 +180,6 @@ async def update_settings(
             
             logger.info(f"Setting AI_PROVIDER to {data.ai_provider}")
             update_env_var("AI_PROVIDER", data.ai_provider)
-            os.environ["AI_PROVIDER"] = data.ai_provider
             changes_made = True
         
         if data.api_key:
@@ -99,18 +187,15 @@ async def update_settings(
             if data.ai_provider == "openai" or (not data.ai_provider and settings.AI_PROVIDER == "openai"):
                 logger.info("Setting OPENAI_API_KEY")
                 update_env_var("OPENAI_API_KEY", data.api_key)
-                os.environ["OPENAI_API_KEY"] = data.api_key
             else:  # Default to Gemini
                 logger.info("Setting GEMINI_API_KEY")
                 update_env_var("GEMINI_API_KEY", data.api_key)
-                os.environ["GEMINI_API_KEY"] = data.api_key
             
             changes_made = True
         
         if data.serper_api_key:
             logger.info("Setting SERPER_API_KEY")
             update_env_var("SERPER_API_KEY", data.serper_api_key)
-            os.environ["SERPER_API_KEY"] = data.serper_api_key
             changes_made = True
         
         if not changes_made:
@@ -118,19 +203,24 @@ async def update_settings(
             return {"success": True, "message": "No changes were made to settings"}
         
         # Write back to .env file
+        env_content = "\n".join(raw for _, _, raw in env_lines) + "\n"
         try:
-            with open(env_path, 'w') as f:
-                f.write(env_content)
-            logger.info(f"Updated .env file successfully with {len(env_content)} characters")
-        except Exception as e:
-            logger.error(f"Error writing to .env file: {str(e)}", exc_info=True)
+            write_env_file(env_path, env_content)
+            ENV_CACHE["content"] = env_content
+            ENV_CACHE["mtime_ns"] = os.stat(env_path).st_mtime_ns
+            logger.debug("Updated .env file with %d characters", len(env_content))
+        except OSError as e:
+            logger.error("Error writing to .env file: %s", e)
             raise HTTPException(
                 status_code=500, 
                 detail=f"Failed to write to .env file: {str(e)}"
             )
         
-        # Reload settings in application
-        reload_settings()
+        # Reload settings in application from the content just written
+        reload_settings(env_content)
+        
+        # Rebuild the shared orchestrator with the new provider/keys on next use
+        get_orchestrator.cache_clear()
         
         logger.info("Settings updated successfully")
         return {
@@ -138,8 +228,10 @@ async def update_settings(
             "message": "Settings updated successfully. Please restart the server for changes to take effect."
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error updating settings: {str(e)}", exc_info=True)
+        logger.error("Error updating settings: %s", e)
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to update settings: {str(e)}"
@@ -149,7 +241,7 @@ async def update_settings(
 @router.get("/", response_model=dict)
 async def get_settings(
     request: Request,
-    current_user: User = Depends(get_current_active_user)
+    current_user: CachedUser = Depends(get_current_active_user)
 ):
     """Get current application settings.
     
@@ -162,7 +254,7 @@ async def get_settings(
     """
     try:
         logger.info(f"User {current_user.username} is retrieving current settings")
-        logger.info(f"Request headers: {request.headers}")
+        logger.debug("Request headers: %s", request.headers)
         
         # Don't return actual API keys, just indicate if they're set
         return {
@@ -188,5 +280,20 @@ async def get_debug_settings(current_user = Depends(get_current_user)):
         "env_ai_provider": os.environ.get("AI_PROVIDER", "not set"),
         "openai_key_exists": bool(settings.OPENAI_API_KEY),
         "gemini_key_exists": bool(settings.GEMINI_API_KEY),
-        "reload_attempt": reload_settings()
-    }
\ No newline at end of file
+        "reload_attempt": await asyncio.to_thread(reload_settings)
+    }
+
+@router.get("/debug/pool", response_model=Dict[str, Any])
+async def get_debug_pool(current_user = Depends(get_current_user)):
+    """Debug endpoint to inspect database connection pool usage."""
+    pool = engine.sync_engine.pool
+    return {
+        "status": pool.status(),
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "timeout": settings.DB_POOL_TIMEOUT,
+        "recycle": settings.DB_POOL_RECYCLE
+    }
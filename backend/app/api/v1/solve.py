@@ -3,23 +3,25 @@
 This module defines the API routes for submitting and retrieving coding problem solutions.
 """
 
-from fastapi import APIRouter, Body, HTTPException, Request, Response, BackgroundTasks, Depends
+from fastapi import APIRouter, Body, HTTPException, Request, Response, Depends, Query
 from fastapi.routing import APIRoute
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any, Callable
 import logging
 import json
-import uuid
 import asyncio
 import time  # Add this import
-from datetime import datetime
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from uuid6 import uuid7
 
-from ...core.orchestrator import AgentOrchestrator
-from ...models.models import TaskStatus, SolveRequest, TaskResponse, SolutionResponse
-from ...auth.deps import get_current_active_user
-from ...db.models import User, Task
-from ...db.database import get_db
+from ...core.orchestrator import get_orchestrator
+from ...models.models import TaskStatus, SolveRequest, TaskResponse, SolutionResponse, TaskHistoryItem, TaskStatusResponse
+from ...auth.deps import get_current_active_user, CachedUser
+from ...db.models import Task
+from ...db.database import get_db, engine, AsyncSessionLocal
 from .events import task_status_update
 
 # Configure logging
@@ -28,19 +30,52 @@ logger = logging.getLogger("api.solve")
 # Create router 
 router = APIRouter()
 
-@router.post("/", response_model=TaskResponse)
+# Solution tasks running on the event loop, keyed by task ID. Holding the handles keeps
+# the tasks from being garbage collected mid-run and lets them be cancelled.
+RUNNING_TASKS: Dict[str, asyncio.Task] = {}
+
+# Statuses a task can still be cancelled from. TaskStatus is a str enum, so plain
+# strings read back from the DB match the members here as well.
+CANCELLABLE_STATUSES = frozenset((TaskStatus.PENDING, TaskStatus.PROCESSING))
+
+# Single-statement phase write, compiled once. It skips cancelled tasks, so zero rows
+# updated means the task was cancelled.
+UPDATE_PHASE_STMT = (
+    update(Task)
+    .where(Task.id == bindparam("b_task_id"), Task.status != TaskStatus.FAILED)
+    .values(detailed_status=bindparam("b_detailed_status", type_=Task.detailed_status.type))
+)
+
+# Repeated identical (phase, progress) updates closer together than this (seconds) are dropped
+PHASE_UPDATE_INTERVAL = 0.1
+
+async def _task_lookup_error(db: AsyncSession, task_id: str) -> HTTPException:
+    """Explain why a task lookup scoped to the current user found nothing.
+    
+    Only called on a miss, to tell a missing task (404) from another user's task (403).
+    """
+    exists = (await db.execute(select(select(Task.id).where(Task.id == task_id).exists()))).scalar()
+    if not exists:
+        return HTTPException(
+            status_code=404,
+            detail=f"Task with ID {task_id} not found"
+        )
+    return HTTPException(
+        status_code=403,
+        detail="You don't have permission to access this task"
+    )
+
+@router.post("/", response_class=ORJSONResponse, responses={200: {"model": TaskResponse}})
 async def solve_problem(
     request: Request, 
-    background_tasks: BackgroundTasks, 
     data: SolveRequest = Body(...),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Submit a problem to be solved.
     
     Args:
         request: The HTTP request
-        background_tasks: FastAPI background tasks
         data: The problem details
         current_user: The authenticated user
         db: Database session
@@ -49,13 +84,17 @@ async def solve_problem(
         Task information with a unique ID
     """
     try:
-        logger.info(f"Received solve request from user {current_user.username}: {data}")
+        logger.info("Received solve request from user %s", current_user.username)
+        logger.debug("Solve request: %s", data)
         
-        # Generate task ID
-        task_id = str(uuid.uuid4())
+        # Generate a time-ordered task ID so primary key inserts stay append-only
+        task_id = uuid7().hex
         
-        # Create task entry in database
+        # Create task entry in database; created_at is set here so no refresh is needed to read it back
         detailed_status = {"phase": "planning", "progress": 0}
+        # Stored and returned as the same value: the DATETIME column keeps whole seconds
+        # and hands back naive UTC, so match that instead of echoing the raw clock
+        created_at = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
         
         db_task = Task(
             id=task_id,
@@ -64,28 +103,30 @@ async def solve_problem(
             requirements=data.requirements,
             language=data.language,
             additional_context=data.additional_context,
-            detailed_status=detailed_status
+            detailed_status=detailed_status,
+            created_at=created_at
         )
         
         db.add(db_task)
-        db.commit()
-        db.refresh(db_task)
+        await db.commit()
         
-        # Process in background
-        background_tasks.add_task(
-            process_solution_task,
+        # Process on the event loop, independent of this request's lifecycle
+        handle = asyncio.create_task(process_solution_task(
             task_id=task_id,
             requirements=data.requirements,
             language=data.language,
             additional_context=data.additional_context
-        )
+        ))
+        RUNNING_TASKS[task_id] = handle
+        handle.add_done_callback(lambda _: RUNNING_TASKS.pop(task_id, None))
         
-        return TaskResponse(
-            task_id=task_id,
-            status=TaskStatus.PENDING,
-            created_at=db_task.created_at.isoformat(),
-            detailed_status=detailed_status
-        )
+        # Returned as a ready response so FastAPI skips model validation and re-encoding
+        return ORJSONResponse({
+            "task_id": task_id,
+            "status": TaskStatus.PENDING.value,
+            "created_at": created_at,
+            "detailed_status": detailed_status
+        })
     
     except Exception as e:
         logger.error(f"Error processing solve request: {str(e)}")
@@ -94,12 +135,12 @@ async def solve_problem(
             detail=f"Failed to process request: {str(e)}"
         )
 
-@router.get("/task/{task_id}", response_model=SolutionResponse)
+@router.get("/task/{task_id}", response_class=ORJSONResponse, responses={200: {"model": SolutionResponse}})
 async def get_solution(
     request: Request, 
     task_id: str, 
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get the solution for a specific task.
     
@@ -113,31 +154,24 @@ async def get_solution(
         The solution if available
     """
     try:
-        # Query task from database
-        task = db.query(Task).filter(Task.id == task_id).first()
+        # Query task from database; ownership is part of the lookup
+        task = (await db.execute(
+            select(Task).where(Task.id == task_id, Task.user_id == current_user.id)
+        )).scalar_one_or_none()
         
         if not task:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Task with ID {task_id} not found"
-            )
-        
-        # Verify that the task belongs to the requesting user
-        if task.user_id != current_user.id:
-            raise HTTPException(
-                status_code=403,
-                detail="You don't have permission to access this task"
-            )
+            raise await _task_lookup_error(db, task_id)
         
-        return SolutionResponse(
-            task_id=task_id,
-            status=task.status,
-            solution=task.solution,
-            explanation=task.explanation,
-            code_files=task.code_files,
-            error=task.error,
-            detailed_status=task.detailed_status
-        )
+        # The JSON columns are already plain dicts/lists; serialize them as-is
+        return ORJSONResponse({
+            "task_id": task_id,
+            "status": task.status,
+            "solution": task.solution,
+            "explanation": task.explanation,
+            "code_files": task.code_files,
+            "error": task.error,
+            "detailed_status": task.detailed_status
+        })
     
     except HTTPException:
         raise
@@ -148,12 +182,57 @@ async def get_solution(
             detail=f"Failed to retrieve solution: {str(e)}"
         )
 
-@router.post("/task/{task_id}/cancel", response_model=Dict[str, str])
+@router.get("/task/{task_id}/status", response_class=ORJSONResponse, responses={200: {"model": TaskStatusResponse}})
+async def get_task_status(
+    request: Request, 
+    task_id: str, 
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the status of a specific task, without its solution.
+    
+    Meant for polling: only the status columns are read, never the solution JSON.
+    
+    Args:
+        request: The HTTP request
+        task_id: The unique ID of the task
+        current_user: The authenticated user
+        db: Database session
+        
+    Returns:
+        The task status and progress
+    """
+    try:
+        task = (await db.execute(
+            select(Task.status, Task.error, Task.detailed_status)
+            .where(Task.id == task_id, Task.user_id == current_user.id)
+        )).one_or_none()
+        
+        if not task:
+            raise await _task_lookup_error(db, task_id)
+        
+        return ORJSONResponse({
+            "task_id": task_id,
+            "status": task.status,
+            "error": task.error,
+            "detailed_status": task.detailed_status
+        })
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving status for task {task_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve task status: {str(e)}"
+        )
+
+@router.post("/task/{task_id}/cancel", response_model=Dict[str, str], response_class=ORJSONResponse)
 async def cancel_task(
     request: Request, 
     task_id: str, 
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Cancel a running task.
     
@@ -167,8 +246,37 @@ async def cancel_task(
         Status message
     """
     try:
-        # Query task from database
-        task = db.query(Task).filter(Task.id == task_id).first()
+        # Check ownership and status and cancel in one statement, so nothing can
+        # change the task between the check and the write
+        result = await db.execute(
+            update(Task)
+            .where(
+                Task.id == task_id,
+                Task.user_id == current_user.id,
+                Task.status.in_(CANCELLABLE_STATUSES)
+            )
+            .values(
+                status=TaskStatus.FAILED,
+                error="Task cancelled by user",
+                detailed_status={"phase": "cancelled", "progress": 0}
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        
+        if result.rowcount:
+            # Stop the running pipeline instead of letting it finish in the background
+            handle = RUNNING_TASKS.get(task_id)
+            if handle and not handle.done():
+                handle.cancel()
+            
+            logger.info(f"Task {task_id} cancelled by user {current_user.username}")
+            return {"message": "Task cancelled successfully"}
+        
+        # Nothing updated; look the task up only to explain why
+        task = (await db.execute(
+            select(Task.user_id, Task.status).where(Task.id == task_id)
+        )).one_or_none()
         
         if not task:
             raise HTTPException(
@@ -183,19 +291,7 @@ async def cancel_task(
                 detail="You don't have permission to cancel this task"
             )
         
-        # Only allow cancellation of pending or processing tasks
-        if task.status in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
-            task.status = TaskStatus.FAILED
-            task.error = "Task cancelled by user"
-            task.detailed_status = {"phase": "cancelled", "progress": 0}
-            
-            # Save changes to database
-            db.commit()
-            
-            logger.info(f"Task {task_id} cancelled by user {current_user.username}")
-            return {"message": "Task cancelled successfully"}
-        else:
-            return {"message": f"Task already in {task.status} state, cannot cancel"}
+        return {"message": f"Task already in {task.status} state, cannot cancel"}
     
     except HTTPException:
         raise
@@ -206,13 +302,15 @@ async def cancel_task(
             detail=f"Failed to cancel task: {str(e)}"
         )
 
-@router.get("/history", response_model=List[dict])
+@router.get("/history", response_class=ORJSONResponse, responses={200: {"model": List[TaskHistoryItem]}})
 async def get_task_history(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 100
+    current_user: CachedUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None
 ):
     """Get the task history for the current user.
     
@@ -221,28 +319,52 @@ async def get_task_history(
         current_user: The authenticated user
         db: Database session
         skip: Number of records to skip (for pagination)
-        limit: Maximum number of records to return (for pagination)
+        limit: Maximum number of records to return (for pagination, at most 100)
+        before: Only return tasks created before this time; pass the last item's
+            created_at to fetch the next page without an OFFSET scan
+        before_id: The last item's task_id, sent along with `before` so tasks
+            sharing that created_at aren't skipped
         
     Returns:
         List of tasks with basic information
     """
     try:
-        # Query tasks from database
-        tasks = db.query(Task).filter(
+        # Select only the summary columns, truncating requirements in SQL, so the
+        # solution / code_files blobs and full requirement texts never leave the DB
+        query = select(
+            Task.id,
+            Task.status,
+            Task.language,
+            func.substr(Task.requirements, 1, 101).label("requirements_preview"),
+            Task.created_at,
+            Task.detailed_status
+        ).where(
             Task.user_id == current_user.id
-        ).order_by(Task.created_at.desc()).offset(skip).limit(limit).all()
+        )
+        if before is not None:
+            if before_id is not None:
+                # Keyset cursor on (created_at, id); created_at alone has ties at second precision
+                query = query.where(or_(
+                    Task.created_at < before,
+                    and_(Task.created_at == before, Task.id < before_id)
+                ))
+            else:
+                query = query.where(Task.created_at < before)
+        rows = (await db.execute(
+            query.order_by(Task.created_at.desc(), Task.id.desc()).offset(skip).limit(limit)
+        )).all()
         
         # Format task data for response
         result = []
-        for task in tasks:
+        for task_id, task_status, language, preview, created_at, detailed_status in rows:
             result.append({
-                "task_id": task.id,
-                "status": task.status,
-                "language": task.language,
-                "requirements": task.requirements[:100] + "..." if len(task.requirements) > 100 else task.requirements,
-                "created_at": task.created_at.isoformat() if task.created_at else None,
-                "completed": task.status == TaskStatus.COMPLETED,
-                "detailed_status": task.detailed_status
+                "task_id": task_id,
+                "status": task_status,
+                "language": language,
+                "requirements": preview[:100] + "..." if len(preview) > 100 else preview,
+                "created_at": created_at,
+                "completed": task_status == TaskStatus.COMPLETED,
+                "detailed_status": detailed_status
             })
             
         return result
@@ -264,56 +386,75 @@ async def process_solution_task(task_id: str, requirements: str, language: str,
         additional_context: Additional context for the problem
     """
     # Create DB session for background task
-    from ...db.database import SessionLocal
+    db = AsyncSessionLocal()
+    
+    # Owner of the task, for SSE notifications; unknown until the task is loaded
+    user_id = None
     
-    db = SessionLocal()
     try:
-        # Get task from database
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
-            logger.error(f"Task {task_id} not found in database")
+        # Claim the task; another worker may have cancelled it while it was queued
+        result = await db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status == TaskStatus.PENDING)
+            .values(status=TaskStatus.PROCESSING)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await db.rollback()
+            logger.info(f"Task {task_id} not found or no longer pending")
             return
+        user_id = (await db.execute(select(Task.user_id).where(Task.id == task_id))).scalar_one()
+        await db.commit()
+        
+        # Shared orchestrator; AI clients are reused across tasks
+        orchestrator = get_orchestrator()
         
-        # Update task status
-        task.status = TaskStatus.PROCESSING
-        db.commit()
+        # Last update sent and when, to coalesce bursts of identical updates;
+        # a new progress value is always written so the latest one is never lost
+        last_update = {"phase": None, "progress": None, "time": 0.0}
         
-        # Initialize orchestrator
-        orchestrator = AgentOrchestrator()
-          # Set up phase listener to update detailed status and send SSE updates
-        def phase_update_callback(phase: str, progress: Optional[float] = None):
-            nonlocal task, db
+        # Set up phase listener to update detailed status and send SSE updates.
+        # The orchestrator awaits it, so updates are written in the order they are reported.
+        async def phase_update_callback(phase: str, progress: Optional[float] = None):
+            now = time.monotonic()
+            if (
+                phase == last_update["phase"]
+                and progress == last_update["progress"]
+                and now - last_update["time"] < PHASE_UPDATE_INTERVAL
+            ):
+                return
+            last_update["phase"] = phase
+            last_update["progress"] = progress
+            last_update["time"] = now
+            
+            # Create a more detailed status message
+            detailed_status = {
+                "phase": phase,
+                "progress": progress or 0
+            }
             try:
-                # Need to refresh task to prevent stale data issues
-                db.refresh(task)
-                
-                # Create a more detailed status message
-                detailed_status = {
-                    "phase": phase,
-                    "progress": progress or 0
-                }
-                task.detailed_status = detailed_status
-                db.commit()
-                
-                # Create a sync version of the task_status_update call to ensure it completes
-                # before returning from this callback
-                loop = asyncio.get_event_loop()
-                update_future = asyncio.run_coroutine_threadsafe(
-                    task_status_update(
-                        task_id=task_id,
-                        user_id=task.user_id,
-                        status=task.status,
-                        detailed_status=detailed_status
-                    ),
-                    loop
-                )
-                
-                # Add small delay to ensure the update is processed before continuing
-                time.sleep(0.05)
-                
-                logger.info(f"Task {task_id} phase updated: {phase}, progress: {progress}")
+                # One UPDATE on its own connection; nothing is read back
+                async with engine.begin() as conn:
+                    result = await conn.execute(
+                        UPDATE_PHASE_STMT,
+                        {"b_task_id": task_id, "b_detailed_status": detailed_status}
+                    )
             except Exception as e:
-                logger.error(f"Error updating task phase: {str(e)}", exc_info=True)
+                logger.error("Error updating task phase: %s", e)
+                return
+            
+            # Cancelled through a worker that doesn't hold this task's handle
+            if result.rowcount == 0:
+                raise asyncio.CancelledError()
+            
+            await task_status_update(
+                task_id=task_id,
+                user_id=user_id,
+                status=TaskStatus.PROCESSING,
+                detailed_status=detailed_status
+            )
+            
+            logger.debug("Task %s phase updated: %s", task_id, detailed_status)
         
         # Solve the problem
         solution = await orchestrator.solve_problem(
@@ -338,7 +479,9 @@ async def process_solution_task(task_id: str, requirements: str, language: str,
             "file_structure": file_structure,  # Store the full file structure
         }
         
-        # Convert file_structure dictionary to a list of file dictionaries
+        # Convert file_structure dictionary to a list of file dictionaries. The developer agent
+        # only describes files (path/description/components), so entries carry metadata only;
+        # the code itself is stored once, in solution["code"]
         code_files_list = []
         if isinstance(file_structure, dict):
             # Handle files from file_structure
@@ -347,7 +490,6 @@ async def process_solution_task(task_id: str, requirements: str, language: str,
                     if isinstance(file_info, dict):
                         code_files_list.append({
                             "path": file_info.get("path", "main.py"),
-                            "content": solution_code,
                             "description": file_info.get("description", ""),
                         })
             
@@ -355,61 +497,91 @@ async def process_solution_task(task_id: str, requirements: str, language: str,
             if not code_files_list:
                 code_files_list.append({
                     "path": f"main.{language}",
-                    "content": solution_code,
                     "description": "Main solution file",
                 })
-          # Update task with solution
-        task.solution = solution_dict
-        task.explanation = problem_analysis
-        task.code_files = code_files_list
-        detailed_status = {"phase": "completed", "progress": 100}
-        task.detailed_status = detailed_status
-        task.status = TaskStatus.COMPLETED
         
-        db.commit()
+        # Update task with solution, unless a cancellation landed while the pipeline was finishing
+        detailed_status = {"phase": "completed", "progress": 100}
+        result = await db.execute(
+            update(Task)
+            .where(Task.id == task_id, Task.status != TaskStatus.FAILED)
+            .values(
+                solution=solution_dict,
+                explanation=problem_analysis,
+                code_files=code_files_list,
+                detailed_status=detailed_status,
+                status=TaskStatus.COMPLETED
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if result.rowcount == 0:
+            logger.info(f"Task {task_id} was cancelled, discarding its solution")
+            return
         
-        # Instead of using create_task, directly await the task_status_update call
-        # to ensure it's processed before returning
+        # Publishing appends to the user's SSE broadcast buffer before returning, so
+        # the event is queued for every connected client once this await completes
         try:
             await task_status_update(
                 task_id=task_id,
-                user_id=task.user_id,
+                user_id=user_id,
                 status=TaskStatus.COMPLETED,
                 detailed_status=detailed_status
             )
             
-            # Small delay to ensure the update is processed
-            await asyncio.sleep(0.5)
-            
             logger.info(f"Task {task_id} completed successfully and notification sent")
         except Exception as notify_error:
-            logger.error(f"Error sending completion notification: {str(notify_error)}", exc_info=True)
+            logger.error("Error sending completion notification: %s", notify_error)
         
+    except asyncio.CancelledError:
+        logger.info(f"Task {task_id} cancelled")
+        try:
+            await db.rollback()
+            detailed_status = {"phase": "cancelled", "progress": 0}
+            # cancel_task has already recorded the cancellation; cover other cancellers such as shutdown
+            await db.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.status.in_(CANCELLABLE_STATUSES))
+                .values(status=TaskStatus.FAILED, error="Task cancelled", detailed_status=detailed_status)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            
+            if user_id is not None:
+                await task_status_update(
+                    task_id=task_id,
+                    user_id=user_id,
+                    status=TaskStatus.FAILED,
+                    detailed_status=detailed_status
+                )
+        except Exception as db_error:
+            logger.error(f"Error updating task cancellation status: {str(db_error)}", exc_info=True)
+        raise
     except Exception as e:
         logger.error(f"Error processing task {task_id}: {str(e)}", exc_info=True)
         try:
-            # Update task with error
-            task = db.query(Task).filter(Task.id == task_id).first()
-            if task:
-                task.status = TaskStatus.FAILED
-                task.error = str(e)
-                detailed_status = {"phase": "failed", "progress": 0}
-                task.detailed_status = detailed_status
-                db.commit()
-                
+            # Update task with error, unless it was already cancelled or finished
+            await db.rollback()
+            detailed_status = {"phase": "failed", "progress": 0}
+            result = await db.execute(
+                update(Task)
+                .where(Task.id == task_id, Task.status.in_(CANCELLABLE_STATUSES))
+                .values(status=TaskStatus.FAILED, error=str(e), detailed_status=detailed_status)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            
+            if result.rowcount and user_id is not None:
                 # Directly await the failure notification
                 await task_status_update(
                     task_id=task_id,
-                    user_id=task.user_id,
+                    user_id=user_id,
                     status=TaskStatus.FAILED,
                     detailed_status=detailed_status
                 )
                 
-                # Small delay to ensure the update is processed
-                await asyncio.sleep(0.5)
-                
                 logger.info(f"Task {task_id} failure notification sent")
         except Exception as db_error:
             logger.error(f"Error updating task failure status: {str(db_error)}", exc_info=True)
     finally:
-        db.close()
\ No newline at end of file
+        await db.close()
\ No newline at end of file
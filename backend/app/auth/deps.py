@@ -1,6 +1,10 @@
 from fastapi import Depends, HTTPException, status, Request as FastAPIRequest
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
+from cachetools import TTLCache
+from dataclasses import dataclass
 import fastapi
 from jose import jwt
 import logging
@@ -16,58 +20,44 @@ logger = logging.getLogger("auth.deps")
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login", auto_error=False)
 
-async def get_current_user(
-    request: FastAPIRequest = None,
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Detached snapshot of the User columns needed to authorize a request"""
+    id: int
+    username: str
+    is_active: bool
+
+
+# Authenticated users by username, so most requests skip the users table entirely.
+# Pop an entry whenever its username or is_active changes.
+USER_CACHE = TTLCache(maxsize=10_000, ttl=30)
+
+
+async def load_cached_user(db: AsyncSession, username: str) -> Optional[CachedUser]:
     """
-    Get current authenticated user from token.
-    For SSE connections, also check query parameters since EventSource can't set headers.
+    Look up a user by username, going to the database only on a cache miss
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-      # First try the standard OAuth2 token from header
-    if not token and request:
-        # If no token in header, check query parameters (for EventSource)
-        token = request.query_params.get("token")
-        logger.info(f"Using token from query params: {token[:10]}..." if token else "No token in query params")
-    else:
-        logger.info(f"Using token from header: {token[:10]}..." if token else "No token in header")
-    
-    if not token:
-        raise credentials_exception
-    
-    payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
+    user = USER_CACHE.get(username)
+    if user is not None:
+        return user
     
-    # Check if token is an access token (not a refresh token)
-    token_type = payload.get("token_type")
-    if token_type != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token type. Expected access token.",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    row = (await db.execute(
+        select(User)
+        .options(load_only(User.id, User.username, User.is_active))
+        .where(User.username == username)
+    )).scalar_one_or_none()
+    if row is None:
+        return None
     
-    username: str = payload.get("sub")
-    if username is None:
-        raise credentials_exception
-            
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-        
+    user = CachedUser(id=row.id, username=row.username, is_active=row.is_active)
+    USER_CACHE[username] = user
     return user
 
-async def get_user_from_token_param(token: str, db: Session = Depends(get_db)) -> User:
+
+async def _validate_access_token(token: Optional[str], db: AsyncSession) -> CachedUser:
     """
-    Get user from token provided as query parameter
-    This is used for EventSource connections which can't set Authorization headers
+    Resolve the user for an access token, shared by the header and query parameter flows
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,40 +66,66 @@ async def get_user_from_token_param(token: str, db: Session = Depends(get_db)) -
     )
     
     if not token:
-        logger.error("Missing token in query parameter")
+        logger.error("Missing access token")
         raise credentials_exception
-        
-    logger.info(f"Authenticating with token from query param: {token[:10]}...")
     
     payload = decode_token(token)
     if payload is None:
-        logger.error("Invalid token in query parameter")
+        logger.error("Invalid access token")
         raise credentials_exception
-        
+    
     # Check if token is an access token (not a refresh token)
     token_type = payload.get("token_type")
     if token_type != "access":
-        logger.error(f"Invalid token type in query parameter: {token_type}")
+        logger.error(f"Invalid token type: {token_type}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token type. Expected access token.",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
+    
     username: str = payload.get("sub")
     if username is None:
         logger.error("No username in token payload")
         raise credentials_exception
             
-    user = db.query(User).filter(User.username == username).first()
-    
+    user = await load_cached_user(db, username)
     if user is None:
         logger.error(f"No user found for username: {username}")
         raise credentials_exception
         
     return user
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_user(
+    request: FastAPIRequest = None,
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> CachedUser:
+    """
+    Get current authenticated user from token.
+    For SSE connections, also check query parameters since EventSource can't set headers.
+    """
+    # First try the standard OAuth2 token from header
+    if not token and request:
+        # If no token in header, check query parameters (for EventSource)
+        token = request.query_params.get("token")
+        logger.info(f"Using token from query params: {token[:10]}..." if token else "No token in query params")
+    else:
+        logger.info(f"Using token from header: {token[:10]}..." if token else "No token in header")
+    
+    return await _validate_access_token(token, db)
+
+async def get_user_from_token_param(token: str, db: AsyncSession = Depends(get_db)) -> CachedUser:
+    """
+    Get user from token provided as query parameter
+    This is used for EventSource connections which can't set Authorization headers
+    """
+    if token:
+        logger.info(f"Authenticating with token from query param: {token[:10]}...")
+    
+    return await _validate_access_token(token, db)
+
+async def get_current_active_user(current_user: CachedUser = Depends(get_current_user)) -> CachedUser:
     """
     Get current active user
     """
@@ -2,7 +2,10 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import asyncio
 import os
+import time
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from ..core.config import settings
 
@@ -17,6 +20,12 @@ SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
+# Decoded payloads by raw token, so repeat requests (e.g. SSE reconnects) skip the
+# signature check. Rejected tokens are remembered briefly to fail fast on retries.
+# Only touched from the event loop thread, with no awaits in between, so no lock is needed.
+TOKEN_CACHE = TTLCache(maxsize=4096, ttl=60)
+INVALID_TOKEN_CACHE = TTLCache(maxsize=1024, ttl=5)
+
 def verify_password(plain_password, hashed_password):
     """Verify password against hashed password"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -25,6 +34,14 @@ def get_password_hash(password):
     """Hash password for secure storage"""
     return pwd_context.hash(password)
 
+async def averify_password(plain_password, hashed_password):
+    """Verify password in a worker thread so bcrypt doesn't block the event loop"""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+
+async def aget_password_hash(password):
+    """Hash password in a worker thread so bcrypt doesn't block the event loop"""
+    return await asyncio.to_thread(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -42,8 +59,21 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def decode_token(token: str) -> Dict[str, Any]:
     """Decode a JWT token (access or refresh)"""
+    payload = TOKEN_CACHE.get(token)
+    if payload is not None:
+        # Cached entries can outlive the token itself; a token without exp never expires
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+        TOKEN_CACHE.pop(token, None)
+        return None
+    if token in INVALID_TOKEN_CACHE:
+        return None
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        INVALID_TOKEN_CACHE[token] = True
+        return None
+    TOKEN_CACHE[token] = payload
+    return payload
\ No newline at end of file
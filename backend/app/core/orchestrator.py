@@ -5,10 +5,14 @@ workflow between different specialized agents.
 """
 
 import logging
-import asyncio
+import hashlib
 import html
 import re
-from typing import Dict, Any, List, Optional, Callable
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+import orjson
+from cachetools import TTLCache
 
 from ..agents.planner import PlannerAgent
 from ..agents.researcher import ResearchAgent
@@ -21,6 +25,18 @@ from ..models.models import Solution
 # Configure logging
 logger = logging.getLogger("core.orchestrator")
 
+# Patterns for pulling examples out of problem requirements, compiled once
+EXAMPLE_RE = re.compile(
+    r"Example[s]?[\s\d]*:[\s\n]*(Input[\s\n]*:[\s\n]*(.+?)[\s\n]*Output[\s\n]*:[\s\n]*(.+?)(?=Example|Constraint|$))",
+    re.DOTALL | re.IGNORECASE
+)
+CONSTRAINT_SPLIT_RE = re.compile(r"\s*\n+\s*Constraint", re.IGNORECASE)
+EXPLANATION_SPLIT_RE = re.compile(r"\s*\n+\s*Explanation:", re.IGNORECASE)
+
+# Phase results kept for repeat submissions of the same problem
+PHASE_CACHE_SIZE = 256
+PHASE_CACHE_TTL = 60 * 60  # seconds
+
 
 class AgentOrchestrator:
     """Orchestrator that coordinates the collaborative workflow between agents."""
@@ -36,14 +52,57 @@ class AgentOrchestrator:
         self.code_generator_agent = DeveloperAgent(self.ai_service)
         self.test_executor_agent = TesterAgent(self.ai_service)
         
+        # Serialized agent results by content hash of (phase, input). Lives with the
+        # orchestrator, so changing the AI provider starts from an empty cache.
+        self.phase_cache = TTLCache(maxsize=PHASE_CACHE_SIZE, ttl=PHASE_CACHE_TTL)
+        
         logger.info("Agent Orchestrator initialized")
     
+    async def _cached_call(
+        self,
+        phase: str,
+        inputs: Dict[str, Any],
+        fn: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        cacheable: Callable[[Dict[str, Any]], bool]
+    ) -> Dict[str, Any]:
+        """Run an agent phase, reusing the result of an identical earlier call.
+        
+        Args:
+            phase: Name of the phase, part of the cache key
+            inputs: The agent input; hashed with the phase to form the key
+            fn: The agent call to make on a cache miss
+            cacheable: Whether a result may be cached; agents return fallback
+                results instead of raising, and those must not be reused
+            
+        Returns:
+            The agent result, freshly decoded on a hit so callers can mutate it
+        """
+        try:
+            key = hashlib.sha256(
+                phase.encode() + b"\0" + orjson.dumps(inputs, option=orjson.OPT_SORT_KEYS)
+            ).hexdigest()
+        except TypeError:
+            return await fn(inputs)
+        
+        cached = self.phase_cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached {phase} result")
+            return orjson.loads(cached)
+        
+        result = await fn(inputs)
+        if isinstance(result, dict) and cacheable(result):
+            try:
+                self.phase_cache[key] = orjson.dumps(result)
+            except TypeError:
+                pass
+        return result
+    
     async def solve_problem(
         self, 
         requirements: str, 
         language: str = "python", 
         additional_context: Optional[str] = None,
-        phase_callback: Optional[Callable[[str, Optional[float]], None]] = None
+        phase_callback: Optional[Callable[[str, Optional[float]], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """Solve a programming problem through collaborative agent workflow.
         
@@ -51,7 +110,8 @@ class AgentOrchestrator:
             requirements: The programming problem requirements
             language: The target programming language
             additional_context: Additional context or constraints for the problem
-            phase_callback: Optional callback function to report phase progress
+            phase_callback: Optional async callback to report phase progress; awaited
+                before the workflow moves on
             
         Returns:
             Solution object with code, approach, and analysis
@@ -68,9 +128,7 @@ class AgentOrchestrator:
             
             # First phase_callback to ensure frontend receives initial state
             if phase_callback:
-                phase_callback("planning", 10)
-                # Small delay for frontend to process
-                await asyncio.sleep(0.1)
+                await phase_callback("planning", 10)
             
             # Phase 1: Planning
             planning_input = {
@@ -79,15 +137,21 @@ class AgentOrchestrator:
             }
             
             logger.info("Phase 1: Planning solution approach")
-            plan_result = await self.planner_agent.process(planning_input)
+            plan_result = await self._cached_call(
+                "planning", planning_input, self.planner_agent.process,
+                cacheable=lambda result: bool(result.get("problem_analysis"))
+            )
             logger.info(f"Planning result: {plan_result}")
             
+            # Examples in the requirements don't depend on the code; extract them once
+            # and reuse them for the initial and every refined test script
+            extracted_test_cases = self.test_executor_agent._extract_test_cases_from_requirements(full_requirements)
+            logger.info(f"Test cases extracted:\n {extracted_test_cases}")
+            
             # Update phase status - send twice to ensure it's received
             if phase_callback:
-                phase_callback("planning", 25)
-                await asyncio.sleep(0.1)
-                phase_callback("research", 30)
-                await asyncio.sleep(0.1)
+                await phase_callback("planning", 25)
+                await phase_callback("research", 30)
             
             # Phase 2: Research
             research_input = {
@@ -97,15 +161,16 @@ class AgentOrchestrator:
             }
             
             logger.info("Phase 2: Researching relevant information")
-            research_result = await self.research_agent.process(research_input)
+            research_result = await self._cached_call(
+                "research", research_input, self.research_agent.process,
+                cacheable=lambda result: bool(result.get("summary"))
+            )
             logger.info(f"Research result: {research_result}")
             
             # Update phase status with extra confirmation
             if phase_callback:
-                phase_callback("research", 45)
-                await asyncio.sleep(0.1)
-                phase_callback("code_generation", 50)
-                await asyncio.sleep(0.1)
+                await phase_callback("research", 45)
+                await phase_callback("code_generation", 50)
             
             # Phase 3: Code Generation
             code_gen_input = {
@@ -116,6 +181,7 @@ class AgentOrchestrator:
             }
             logger.info("Phase 3: Generating code solution")
             try:
+                # Not cached: resubmitting after a failing result must get fresh code
                 code_result = await self.code_generator_agent.process(code_gen_input)
                 # Ensure code_result is a dictionary
                 if not isinstance(code_result, dict):
@@ -127,21 +193,21 @@ class AgentOrchestrator:
             
             # Send another update midway through code generation
             if phase_callback:
-                phase_callback("code_generation", 60)
-                await asyncio.sleep(0.1)
+                await phase_callback("code_generation", 60)
             
             # Generate test cases based on requirements and code analysis
             try:
                 code_str = code_result.get("code", "") if isinstance(code_result, dict) else ""
-                test_cases_code = await self.test_executor_agent._generate_test_cases_code(full_requirements, code_str, clean_lang)
+                test_cases_code = await self.test_executor_agent._generate_test_cases_code(
+                    full_requirements, code_str, clean_lang, extracted_test_cases
+                )
             except Exception as e:
                 logger.error(f"Error generating test cases: {e}")
                 test_cases_code = ""
     
             # Update phase status with confirmation
             if phase_callback:
-                phase_callback("test_execution", 70)
-                await asyncio.sleep(0.1)
+                await phase_callback("test_execution", 70)
             
             # Phase 4: Test Execution 
             test_execution_result = None
@@ -188,17 +254,13 @@ class AgentOrchestrator:
                 code = code_result.get("code", "")
                 file_structure = code_result.get("file_structure", {})
                 if phase_callback:
-                    phase_callback("test_execution", 80)
-                    await asyncio.sleep(0.1)
-                    phase_callback("completed", 100)
-                    await asyncio.sleep(0.1)
+                    await phase_callback("test_execution", 80)
+                    await phase_callback("completed", 100)
             else:
                 # Update phase status with clear refinement indicator
                 if phase_callback:
-                    phase_callback("test_execution", 80)
-                    await asyncio.sleep(0.1)
-                    phase_callback("refinement", 85)
-                    await asyncio.sleep(0.1)
+                    await phase_callback("test_execution", 80)
+                    await phase_callback("refinement", 85)
                 # Thêm cơ chế tự động refine code khi test không pass
                 max_refine_attempts = 3  # Số lần refine tối đa
                 refine_count = 0
@@ -212,8 +274,7 @@ class AgentOrchestrator:
                         logger.info(f"Phase 5: Refine attempt {refine_count + 1}/{max_refine_attempts}")
                     
                     if phase_callback:
-                        phase_callback(f"refinement", 85 + (refine_count * 5))
-                        await asyncio.sleep(0.1)
+                        await phase_callback(f"refinement", 85 + (refine_count * 5))
                     
                     # Cập nhật code trong agent_responses nếu đã có refinement trước đó
                     if refine_count > 0:
@@ -235,12 +296,11 @@ class AgentOrchestrator:
                             
                             # Send an update for each refinement attempt
                             if phase_callback:
-                                phase_callback(f"refinement_{refine_count + 1}", 85 + (refine_count * 5))
-                                await asyncio.sleep(0.1)
+                                await phase_callback(f"refinement_{refine_count + 1}", 85 + (refine_count * 5))
                             
                             # Generate new test cases for the refined code
                             refined_test_cases_code = await self.test_executor_agent._generate_test_cases_code(
-                                full_requirements, code, clean_lang
+                                full_requirements, code, clean_lang, extracted_test_cases
                             )
                             test_input = {
                                 "code": refined_test_cases_code,
@@ -283,8 +343,7 @@ class AgentOrchestrator:
                 
                 # Always send a completion update regardless of path taken
                 if phase_callback:
-                    phase_callback("completed", 100)
-                    await asyncio.sleep(0.2)
+                    await phase_callback("completed", 100)
             
             # Compile the final solution
             solution = {
@@ -312,7 +371,7 @@ class AgentOrchestrator:
         except Exception as e:
             logger.error(f"Error in problem-solving workflow: {str(e)}", exc_info=True)
             if phase_callback:
-                phase_callback("failed", 0)
+                await phase_callback("failed", 0)
                 
             return {
                 "status": "failed",
@@ -325,18 +384,17 @@ class AgentOrchestrator:
         test_cases = []
         
         # Pattern 1: "Example: Input: X Output: Y" format
-        example_pattern = r"Example[s]?[\s\d]*:[\s\n]*(Input[\s\n]*:[\s\n]*(.+?)[\s\n]*Output[\s\n]*:[\s\n]*(.+?)(?=Example|Constraint|$))"
-        example_matches = re.finditer(example_pattern, requirements, re.DOTALL | re.IGNORECASE)
+        example_matches = EXAMPLE_RE.finditer(requirements)
         
         for i, match in enumerate(example_matches):
             # Clean the output - remove any trailing constraints or explanations
             raw_output = match.group(3).strip()
             
             # First split by Constraint
-            clean_output = re.split(r"\s*\n+\s*Constraint", raw_output, flags=re.IGNORECASE)[0].strip()
+            clean_output = CONSTRAINT_SPLIT_RE.split(raw_output)[0].strip()
             
             # Then also split by Explanation
-            clean_output = re.split(r"\s*\n+\s*Explanation:", clean_output, flags=re.IGNORECASE)[0].strip()
+            clean_output = EXPLANATION_SPLIT_RE.split(clean_output)[0].strip()
             
             test_cases.append({
                 "description": f"Example {i+1}",
@@ -345,4 +403,18 @@ class AgentOrchestrator:
             })
             logger.info(f"Extracted test case {i+1}: {test_cases[-1]}")
     
-        return test_cases
\ No newline at end of file
+        return test_cases
+
+
+@lru_cache(maxsize=1)
+def get_orchestrator() -> AgentOrchestrator:
+    """Get the shared Agent Orchestrator.
+    
+    The orchestrator and its agents keep no per-task state, so one instance (and its
+    AI client connection pools) is reused across tasks. Call get_orchestrator.cache_clear()
+    after changing AI provider settings to build a fresh one.
+    
+    Returns:
+        The shared AgentOrchestrator instance
+    """
+    return AgentOrchestrator()
@@ -1,28 +1,48 @@
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from typing import AsyncGenerator
 import os
 from dotenv import load_dotenv
 
+from ..core.config import settings
+
 # Load environment variables
 load_dotenv()
 
 # Database connection
 DATABASE_URL = os.getenv("SQL_DB_URL")
 
-# Create engine
-engine = create_engine(DATABASE_URL)
+# Async drivers used in place of the sync ones configured in SQL_DB_URL.
+# Only MySQL is supported: aiomysql is the only async driver installed, and the
+# engine's pool settings assume a queue pool.
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+def to_async_url(url: str) -> str:
+    """Rewrite a sync database URL to use the matching async driver."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+# Create engine; async so queries don't block the event loop. Connections are recycled
+# before MySQL's idle timeout closes them, so checkouts don't need a SELECT 1 pre-ping.
+engine = create_async_engine(
+    to_async_url(DATABASE_URL),
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING
+)
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for models
 Base = declarative_base()
 
 # Dependency for database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -14,7 +14,7 @@ class User(Base):
     avatar = Column(String(255), nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationship with Task model
     tasks = relationship("Task", back_populates="user")
@@ -35,7 +35,13 @@ class Task(Base):
     error = Column(Text, nullable=True)
     detailed_status = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationship with User model
-    user = relationship("User", back_populates="tasks")
\ No newline at end of file
+    user = relationship("User", back_populates="tasks")
+    
+    # History is read per user, newest first, with id as the tie-break; InnoDB scans
+    # this index backwards for ORDER BY created_at DESC, id DESC, so no filesort is needed
+    __table_args__ = (
+        Index("ix_tasks_user_created", "user_id", "created_at", "id"),
+    )
\ No newline at end of file
@@ -1,6 +1,7 @@
 import logging
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import json
 
@@ -17,11 +18,22 @@ logger = logging.getLogger("api")
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
 # Initialize database tables
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+async def init_db():
+    """Create any missing tables."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+@app.on_event("shutdown")
+async def close_db():
+    """Close pooled database connections."""
+    await engine.dispose()
 
 # Debug middleware to log all requests
 # @app.middleware("http")
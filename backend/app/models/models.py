@@ -5,6 +5,7 @@ This module defines the database models and Pydantic models for the application.
 
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
+from datetime import datetime
 from enum import Enum, auto
 
 
@@ -65,7 +66,24 @@ class TaskResponse(BaseModel):
     """Model for task response."""
     task_id: str
     status: TaskStatus
-    created_at: str
+    created_at: datetime
+    detailed_status: Optional[Dict[str, Any]] = None
+
+class TaskHistoryItem(BaseModel):
+    """Model for one entry in a user's task history."""
+    task_id: str
+    status: TaskStatus
+    language: str
+    requirements: str
+    created_at: Optional[datetime] = None
+    completed: bool
+    detailed_status: Optional[Dict[str, Any]] = None
+
+class TaskStatusResponse(BaseModel):
+    """Model for task status response."""
+    task_id: str
+    status: TaskStatus
+    error: Optional[str] = None
     detailed_status: Optional[Dict[str, Any]] = None
 
 class SolutionResponse(BaseModel):
@@ -327,18 +327,14 @@ class OpenAIService(AIService):
 def get_ai_service() -> AIService:
     """Get the appropriate AI service based on configuration.
     
-    This function prioritizes the environment variable AI_PROVIDER over
-    the settings.AI_PROVIDER to ensure the most recent configuration is used.
+    The provider comes from settings.AI_PROVIDER, which reload_settings keeps
+    in sync with the .env file after settings are updated through the API.
     
     Returns:
         An instance of the appropriate AIService implementation
     """
-    # Đọc trực tiếp từ biến môi trường để đảm bảo lấy giá trị mới nhất
-    provider = os.environ.get("AI_PROVIDER", "").lower()
-    
-    # Nếu không có trong biến môi trường, sử dụng giá trị từ settings
-    if not provider:
-        provider = settings.AI_PROVIDER.lower()
+    # settings is updated in place by reload_settings, so it always has the latest provider
+    provider = (settings.AI_PROVIDER or "").lower()
     
     logger.info(f"Using AI provider: {provider}")
     
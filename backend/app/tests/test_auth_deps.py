@@ -0,0 +1,149 @@
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import HTTPException
+from jose import jwt
+
+from ..auth.utils import create_access_token, SECRET_KEY, ALGORITHM, TOKEN_CACHE, INVALID_TOKEN_CACHE
+from ..auth.deps import (
+    CachedUser,
+    USER_CACHE,
+    get_current_user,
+    get_current_active_user,
+    get_user_from_token_param,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    TOKEN_CACHE.clear()
+    INVALID_TOKEN_CACHE.clear()
+    USER_CACHE.clear()
+    yield
+    TOKEN_CACHE.clear()
+    INVALID_TOKEN_CACHE.clear()
+    USER_CACHE.clear()
+
+
+def make_db(user=None):
+    """Async session mock whose execute() returns `user` (or no row)."""
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    db = AsyncMock()
+    db.execute.return_value = result
+    return db
+
+
+def make_user(username="alice", is_active=True):
+    return MagicMock(id=1, username=username, is_active=is_active)
+
+
+def header_flow(token, db):
+    return get_current_user(request=None, token=token, db=db)
+
+
+def query_flow(token, db):
+    return get_user_from_token_param(token=token, db=db)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_valid_token_returns_cached_user(flow):
+    db = make_db(make_user())
+    token = create_access_token({"sub": "alice"})
+
+    user = await flow(token, db)
+
+    assert user == CachedUser(id=1, username="alice", is_active=True)
+    # A second request is served from the user cache
+    assert await flow(token, db) == user
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_refresh_token_is_rejected(flow):
+    db = make_db(make_user())
+    token = jwt.encode({"sub": "alice", "token_type": "refresh"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await flow(token, db)
+
+    assert exc_info.value.status_code == 401
+    assert "token type" in exc_info.value.detail
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_token_without_subject_is_rejected(flow):
+    db = make_db(make_user())
+    token = create_access_token({})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await flow(token, db)
+
+    assert exc_info.value.status_code == 401
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_unknown_user_is_rejected(flow):
+    db = make_db(None)
+    token = create_access_token({"sub": "ghost"})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await flow(token, db)
+
+    assert exc_info.value.status_code == 401
+    assert "ghost" not in USER_CACHE
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_inactive_user_is_rejected(flow):
+    db = make_db(make_user(is_active=False))
+    token = create_access_token({"sub": "alice"})
+
+    user = await flow(token, db)
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_active_user(user)
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_expired_token_is_rejected(flow):
+    db = make_db(make_user())
+    token = create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-10))
+
+    with pytest.raises(HTTPException) as exc_info:
+        await flow(token, db)
+
+    assert exc_info.value.status_code == 401
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flow", [header_flow, query_flow])
+async def test_missing_token_is_rejected(flow):
+    db = make_db(make_user())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await flow(None, db)
+
+    assert exc_info.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_header_flow_falls_back_to_query_parameter():
+    db = make_db(make_user())
+    request = MagicMock()
+    request.query_params = {"token": create_access_token({"sub": "alice"})}
+
+    user = await get_current_user(request=request, token=None, db=db)
+
+    assert user.username == "alice"
+
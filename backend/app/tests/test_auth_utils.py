@@ -0,0 +1,69 @@
+import time
+
+import pytest
+from jose import jwt
+
+from ..auth import utils
+from ..auth.utils import create_access_token, decode_token, SECRET_KEY, ALGORITHM, TOKEN_CACHE, INVALID_TOKEN_CACHE
+
+
+@pytest.fixture(autouse=True)
+def clear_token_caches():
+    TOKEN_CACHE.clear()
+    INVALID_TOKEN_CACHE.clear()
+    yield
+    TOKEN_CACHE.clear()
+    INVALID_TOKEN_CACHE.clear()
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """Count calls to jwt.decode while still decoding for real."""
+    calls = []
+    real_decode = utils.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(utils.jwt, "decode", counting_decode)
+    return calls
+
+
+def test_valid_token_is_decoded_once(decode_calls):
+    token = create_access_token({"sub": "alice"})
+
+    first = decode_token(token)
+    second = decode_token(token)
+
+    assert first["sub"] == "alice"
+    assert second == first
+    assert decode_calls == [token]
+
+
+def test_invalid_token_is_remembered(decode_calls):
+    token = create_access_token({"sub": "alice"}) + "tampered"
+
+    assert decode_token(token) is None
+    assert decode_token(token) is None
+
+    assert decode_calls == [token]
+    assert token in INVALID_TOKEN_CACHE
+    assert token not in TOKEN_CACHE
+
+
+def test_cached_payload_past_its_expiry_is_rejected(decode_calls):
+    token = "cached-token"
+    TOKEN_CACHE[token] = {"sub": "alice", "exp": time.time() - 1}
+
+    assert decode_token(token) is None
+    assert token not in TOKEN_CACHE
+    assert decode_calls == []
+
+
+def test_token_without_expiry_stays_valid_when_cached(decode_calls):
+    token = jwt.encode({"sub": "alice"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    assert decode_token(token) == {"sub": "alice"}
+    assert decode_token(token) == {"sub": "alice"}
+    assert decode_calls == [token]
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from ..api.v1.events import UserBroadcast
+
+
+def test_read_since_returns_messages_after_cursor():
+    broadcast = UserBroadcast(maxlen=8)
+    for message in (b"a", b"b", b"c"):
+        broadcast.publish(message)
+
+    assert broadcast.read_since(0) == ([b"a", b"b", b"c"], 3)
+    assert broadcast.read_since(1) == ([b"b", b"c"], 3)
+    assert broadcast.read_since(3) == ([], 3)
+
+
+def test_readers_keep_independent_cursors():
+    broadcast = UserBroadcast(maxlen=8)
+    first = second = broadcast.seq
+
+    broadcast.publish(b"a")
+    messages, first = broadcast.read_since(first)
+    assert messages == [b"a"]
+
+    broadcast.publish(b"b")
+    assert broadcast.read_since(first) == ([b"b"], 2)
+    assert broadcast.read_since(second) == ([b"a", b"b"], 2)
+
+
+def test_reader_that_falls_behind_resumes_from_buffered_tail():
+    broadcast = UserBroadcast(maxlen=3)
+    for i in range(5):
+        broadcast.publish(str(i).encode())
+
+    messages, cursor = broadcast.read_since(0)
+
+    assert messages == [b"2", b"3", b"4"]
+    assert cursor == 5
+    assert broadcast.read_since(cursor) == ([], 5)
+
+
+@pytest.mark.asyncio
+async def test_publish_wakes_every_waiting_reader():
+    broadcast = UserBroadcast()
+    waiters = [asyncio.ensure_future(broadcast.wait_for_update(0)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert not any(waiter.done() for waiter in waiters)
+
+    broadcast.publish(b"a")
+
+    await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_update_returns_at_once_when_behind():
+    broadcast = UserBroadcast()
+    broadcast.publish(b"a")
+
+    await asyncio.wait_for(broadcast.wait_for_update(0), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_waiter_sleeps_again_after_being_woken():
+    broadcast = UserBroadcast()
+    broadcast.publish(b"a")
+    waiter = asyncio.ensure_future(broadcast.wait_for_update(1))
+    await asyncio.sleep(0)
+
+    assert not waiter.done()
+    broadcast.publish(b"b")
+    await asyncio.wait_for(waiter, timeout=1)
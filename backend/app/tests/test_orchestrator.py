@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock
+from cachetools import TTLCache
+
+from ..core.orchestrator import AgentOrchestrator
+
+
+def make_orchestrator():
+    # Skip __init__, which builds the AI service and agents
+    orchestrator = AgentOrchestrator.__new__(AgentOrchestrator)
+    orchestrator.phase_cache = TTLCache(maxsize=8, ttl=60)
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_cached_call_reuses_result_for_identical_input():
+    orchestrator = make_orchestrator()
+    agent = AsyncMock(return_value={"problem_analysis": "sum two numbers", "approach": ["add"]})
+
+    first = await orchestrator._cached_call("planning", {"requirements": "a+b", "language": "python"}, agent, cacheable=bool)
+    # Key order doesn't matter
+    second = await orchestrator._cached_call("planning", {"language": "python", "requirements": "a+b"}, agent, cacheable=bool)
+
+    assert first == second == {"problem_analysis": "sum two numbers", "approach": ["add"]}
+    agent.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cached_call_returns_independent_copies():
+    orchestrator = make_orchestrator()
+    agent = AsyncMock(return_value={"approach": ["add"]})
+    inputs = {"requirements": "a+b"}
+
+    await orchestrator._cached_call("planning", inputs, agent, cacheable=bool)
+    hit = await orchestrator._cached_call("planning", inputs, agent, cacheable=bool)
+    hit["approach"].append("mutated")
+
+    again = await orchestrator._cached_call("planning", inputs, agent, cacheable=bool)
+    assert again == {"approach": ["add"]}
+
+
+@pytest.mark.asyncio
+async def test_cached_call_keys_on_phase_and_input():
+    orchestrator = make_orchestrator()
+    agent = AsyncMock(return_value={"summary": {"x": 1}})
+
+    await orchestrator._cached_call("planning", {"requirements": "a+b"}, agent, cacheable=bool)
+    await orchestrator._cached_call("research", {"requirements": "a+b"}, agent, cacheable=bool)
+    await orchestrator._cached_call("planning", {"requirements": "a*b"}, agent, cacheable=bool)
+
+    assert agent.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_call_does_not_cache_fallback_results():
+    orchestrator = make_orchestrator()
+    agent = AsyncMock(return_value={"problem_analysis": "", "approach": []})
+    inputs = {"requirements": "a+b"}
+    cacheable = lambda result: bool(result.get("problem_analysis"))
+
+    await orchestrator._cached_call("planning", inputs, agent, cacheable=cacheable)
+    await orchestrator._cached_call("planning", inputs, agent, cacheable=cacheable)
+
+    assert agent.await_count == 2
+    assert len(orchestrator.phase_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_call_bypasses_cache_for_unserializable_input():
+    orchestrator = make_orchestrator()
+    agent = AsyncMock(return_value={"problem_analysis": "ok"})
+    inputs = {"requirements": object()}
+
+    await orchestrator._cached_call("planning", inputs, agent, cacheable=bool)
+    await orchestrator._cached_call("planning", inputs, agent, cacheable=bool)
+
+    assert agent.await_count == 2
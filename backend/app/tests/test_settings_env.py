@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from ..api.v1 import settings as settings_api
+from ..api.v1.settings import ENV_CACHE, load_env_content, parse_env_lines
+
+
+ENV_TEXT = """# AI provider
+AI_PROVIDER=gemini
+
+GEMINI_API_KEY = abc=def
+  SERPER_API_KEY=xyz
+not a setting
+#DISABLED=1
+"""
+
+
+def test_parse_env_lines_splits_keys_and_values():
+    entries = parse_env_lines(ENV_TEXT)
+
+    assert [(key, value) for key, value, _ in entries if key] == [
+        ("AI_PROVIDER", "gemini"),
+        # Only the first '=' separates key and value
+        ("GEMINI_API_KEY", "abc=def"),
+        ("SERPER_API_KEY", "xyz"),
+    ]
+
+
+def test_parse_env_lines_keeps_other_lines_untouched():
+    entries = parse_env_lines(ENV_TEXT)
+
+    assert [raw for key, _, raw in entries if key is None] == [
+        "# AI provider",
+        "",
+        "not a setting",
+        "#DISABLED=1",
+    ]
+    # Writing the raw lines back reproduces the file
+    assert "\n".join(raw for _, _, raw in entries) + "\n" == ENV_TEXT
+
+
+def test_parse_env_lines_empty_text():
+    assert parse_env_lines("") == []
+
+
+@pytest.fixture
+def env_file(tmp_path, monkeypatch):
+    monkeypatch.setitem(ENV_CACHE, "mtime_ns", None)
+    monkeypatch.setitem(ENV_CACHE, "content", "")
+    path = tmp_path / ".env"
+    path.write_text("AI_PROVIDER=gemini\n")
+    return path
+
+
+def test_load_env_content_is_served_from_cache_while_mtime_is_unchanged(env_file):
+    assert load_env_content(env_file) == "AI_PROVIDER=gemini\n"
+
+    # Same mtime: the cached content is returned without re-reading
+    mtime_ns = os.stat(env_file).st_mtime_ns
+    env_file.write_text("AI_PROVIDER=openai\n")
+    os.utime(env_file, ns=(mtime_ns, mtime_ns))
+    assert load_env_content(env_file) == "AI_PROVIDER=gemini\n"
+
+    # A new mtime triggers a reload
+    os.utime(env_file, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+    assert load_env_content(env_file) == "AI_PROVIDER=openai\n"
+
+
+def test_load_env_content_rejects_oversized_file(env_file, monkeypatch):
+    monkeypatch.setattr(settings_api, "MAX_ENV_FILE_SIZE", 8)
+
+    with pytest.raises(ValueError):
+        load_env_content(env_file)
+    assert ENV_CACHE["mtime_ns"] is None
+
+
+def test_load_env_content_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_env_content(tmp_path / ".env")
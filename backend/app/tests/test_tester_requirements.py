@@ -0,0 +1,69 @@
+import pytest
+
+from ..agents.tester import TesterAgent
+
+
+def extract(requirements):
+    # The method doesn't use any agent state
+    return TesterAgent._extract_test_cases_from_requirements(None, requirements)
+
+
+def case(description, input, expected_output):
+    return {"description": description, "input": input, "expected_output": expected_output}
+
+
+@pytest.mark.parametrize("requirements, expected", [
+    ("Write a function that adds two numbers.", []),
+    (
+        "Add two numbers.\n\nExample 1:\nInput: 1 2\nOutput: 3\n\nExample 2:\nInput: 5 7\nOutput: 12\n",
+        [case("Example 1", "1 2", "3"), case("Example 2", "5 7", "12")],
+    ),
+    (
+        "Reverse a string.\nTest Case 1: hello => olleh\nTest Case 2: abc => cba\n",
+        [case("Test Case 1", "hello", "olleh"), case("Test Case 2", "abc", "cba")],
+    ),
+    (
+        "EXAMPLE:\ninput: n = 5\noutput: 120\n\ntest case 3 :  n = 0  =>  1\n",
+        [case("Example 1", "n = 5", "120"), case("Test Case 1", "n = 0", "1")],
+    ),
+    (
+        "Example 1:\nInput:\n3\n1 2 3\nOutput: 6\n",
+        [case("Example 1", "3\n1 2 3", "6")],
+    ),
+])
+def test_extracts_examples_and_test_cases(requirements, expected):
+    assert extract(requirements) == expected
+
+
+def test_examples_come_first_and_are_numbered_separately():
+    requirements = (
+        "Test Case 1: 2 2 => 4\n"
+        "Example 1:\nInput: 1 2\nOutput: 3\n"
+        "Example 2:\nInput: 0 0\nOutput: 0\n"
+    )
+
+    assert extract(requirements) == [
+        case("Example 1", "1 2", "3"),
+        case("Example 2", "0 0", "0"),
+        case("Test Case 1", "2 2", "4"),
+    ]
+
+
+def test_example_inside_an_unterminated_test_case_is_kept():
+    # "Test Case 1" has no "=>" on its own lines, so its match runs on to the next one
+    requirements = "Test Case 1: x\ny\nExample 1:\nInput: 1\nOutput: 2\nTest Case 2: a => b"
+
+    result = extract(requirements)
+
+    assert result[0] == case("Example 1", "1", "2")
+    assert [tc["description"] for tc in result[1:]] == ["Test Case 1"]
+    assert result[1]["expected_output"] == "b"
+
+
+def test_test_case_inside_an_unterminated_example_is_kept():
+    requirements = "Example 1:\nInput: 1\nTest Case 1: a => b\nExample 2:\nInput: 2\nOutput: 3\n"
+
+    result = extract(requirements)
+
+    assert [tc["description"] for tc in result] == ["Example 1", "Test Case 1"]
+    assert result[1] == case("Test Case 1", "a", "b")